@@ -2,6 +2,7 @@ import streamlit as st
 import cv2
 import numpy as np
 from datetime import datetime, date, time, timedelta
+from time import sleep
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -12,7 +13,11 @@ import os
 
 # Import custom modules
 from csv_manager import CSVManager
-from face_recognition_utils import FaceRecognitionSystem
+from face_recognition_utils import FaceRecognitionSystem, MAX_TEMPLATES_PER_TEACHER
+from face_detectors import available_detectors, DEFAULT_DETECTOR
+from shared_gallery import get_shared_gallery
+from recognition_worker import RecognitionWorker
+from attendance_aggregator import AttendanceAggregator
 from time_manager import TimeManager
 from calendar_integration import CalendarIntegration
 from excel_interface import excel_automation_interface
@@ -41,6 +46,12 @@ if 'calendar_integration' not in st.session_state:
 if 'camera_active' not in st.session_state:
     st.session_state.camera_active = False
 
+if 'recognition_worker' not in st.session_state:
+    st.session_state.recognition_worker = None
+
+if 'attendance_aggregator' not in st.session_state:
+    st.session_state.attendance_aggregator = AttendanceAggregator(st.session_state.csv_manager)
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -122,12 +133,8 @@ def main():
         ["Dashboard", "Live Attendance", "Teacher Management", "Reports", "Excel Automation", "Settings", "System Status"]
     )
     
-    # Load face encodings for recognition
-    teachers_df = st.session_state.csv_manager.get_all_teachers()
-    if not teachers_df.empty:
-        face_encodings = st.session_state.csv_manager.get_teacher_face_encodings()
-        teacher_names = dict(zip(teachers_df['ID'], teachers_df['Name']))
-        st.session_state.face_system.load_known_faces(face_encodings, teacher_names)
+    # Load face encodings for recognition (only reloads when teachers changed)
+    get_shared_gallery().load_into(st.session_state.face_system, st.session_state.csv_manager)
     
     # Route to different pages
     if page == "Dashboard":
@@ -284,13 +291,27 @@ def show_live_attendance():
     
     # Camera controls
     col1, col2 = st.columns([3, 1])
+    face_system = st.session_state.face_system
     
     with col2:
         if st.button("🎥 Start Camera", disabled=not status.get('can_mark_attendance', False)):
             st.session_state.camera_active = True
+            if st.session_state.recognition_worker is None:
+                # The worker thread gets its own system; the page's one stays script-thread only
+                st.session_state.recognition_worker = RecognitionWorker(FaceRecognitionSystem(
+                    index_type=face_system.index_type, ivf_threshold=face_system.ivf_threshold,
+                    n_probe=face_system.n_probe, precision=face_system.precision,
+                    quality_gate=face_system.quality_gate, detector=face_system.detector))
+            worker = st.session_state.recognition_worker
+            worker.sync_with(face_system, st.session_state.csv_manager)
+            if not worker.start(camera_source=0):
+                st.warning("The previous camera session is still shutting down, please try again")
         
         if st.button("⏹️ Stop Camera"):
             st.session_state.camera_active = False
+            if st.session_state.recognition_worker is not None:
+                if not st.session_state.recognition_worker.stop():
+                    st.warning("Camera is still shutting down")
         
         # Confidence threshold
         confidence_threshold = st.slider(
@@ -300,21 +321,38 @@ def show_live_attendance():
             value=0.6,
             step=0.05
         )
-        st.session_state.face_system.set_confidence_threshold(confidence_threshold)
+        face_system.set_confidence_threshold(confidence_threshold)
     
+    worker = st.session_state.recognition_worker
     with col1:
-        if st.session_state.camera_active and status.get('can_mark_attendance', False):
-            # Camera placeholder
-            camera_placeholder = st.empty()
+        if st.session_state.camera_active and status.get('can_mark_attendance', False) \
+                and worker is not None and worker.is_running:
+            # Pick up settings and gallery changes between the worker's frames
+            worker.sync_with(face_system, st.session_state.csv_manager)
+            # Frames are captured and recognized by the background worker;
+            # this page only polls the output and votes on it before logging
+            aggregator = st.session_state.attendance_aggregator
+            for entry in worker.poll_results():
+                for teacher_id, success, message in aggregator.add_results(entry['results'], entry['timestamp']):
+                    if success:
+                        st.toast(f"✅ {message}")
+                    else:
+                        st.warning(message)
+            latest_frame, latest_results = worker.latest()
+            if latest_frame is not None:
+                annotated = face_system.draw_face_boxes(latest_frame, latest_results)
+                st.image(annotated, channels="BGR", use_column_width=True)
+            else:
+                st.info("📷 Waiting for camera frames...")
             
-            # This is a placeholder for camera integration
-            # In a real implementation, you would use streamlit-webrtc or similar
-            st.info("📷 Camera feed would appear here. Use streamlit-webrtc for real camera integration.")
+            recognized = [r for r in latest_results if r['is_recognized']]
+            for result in recognized:
+                st.success(f"✅ {result['teacher_name']} ({result['confidence']:.0%})")
             
-            # Simulate face detection for demo
-            if st.button("🔍 Simulate Face Detection"):
-                st.success("Face detected! Processing...")
-                # Here you would process the actual camera frame
+            st.caption(f"Frames processed: {worker.frames_processed} | "
+                       f"dropped: {worker.frames_dropped}")
+            if worker.last_error:
+                st.warning(f"Camera: {worker.last_error}")
         else:
             st.info("Camera is inactive. Start camera when attendance window is open.")
     
@@ -326,6 +364,11 @@ def show_live_attendance():
         st.dataframe(recent_attendance, use_container_width=True)
     else:
         st.info("No attendance records today")
+    
+    # Poll the worker again shortly; the rerun rate only affects the display
+    if st.session_state.camera_active and worker is not None and worker.is_running:
+        sleep(1.0)
+        st.rerun()
 
 def show_teacher_management():
     st.header("👥 Teacher Management")
@@ -370,31 +413,23 @@ def show_teacher_management():
                 else:
                     # Process images
                     with st.spinner("Processing images..."):
-                        success, processed_images, message = st.session_state.face_system.process_uploaded_images(uploaded_files)
+                        success, face_encodings, _, message = \
+                            st.session_state.face_system.enroll_teacher_photos(uploaded_files)
                     
                     if success:
-                        # Generate average face encoding
-                        face_encodings = []
-                        for img in processed_images:
-                            encoding = st.session_state.face_system.encode_face(img)
-                            if encoding is not None:
-                                face_encodings.append(encoding)
+                        # Keep each photo as its own template rather than only the average
+                        templates = np.asarray(face_encodings[:MAX_TEMPLATES_PER_TEACHER])
                         
-                        if face_encodings:
-                            average_encoding = np.mean(face_encodings, axis=0)
-                            
-                            # Add to database
-                            success, db_message = st.session_state.csv_manager.add_teacher(
-                                teacher_id, teacher_name, department, average_encoding, email
-                            )
-                            
-                            if success:
-                                st.success(f"✅ {db_message}")
-                                st.balloons()
-                            else:
-                                st.error(f"❌ {db_message}")
+                        # Add to database
+                        success, db_message = st.session_state.csv_manager.add_teacher(
+                            teacher_id, teacher_name, department, templates, email
+                        )
+                        
+                        if success:
+                            st.success(f"✅ {db_message}")
+                            st.balloons()
                         else:
-                            st.error("Could not generate face encodings from uploaded images")
+                            st.error(f"❌ {db_message}")
                     else:
                         st.error(f"❌ {message}")
     
@@ -542,6 +577,13 @@ def show_reports():
         st.subheader("📁 Daily Attendance Files")
         st.info("📝 Each day's attendance is stored in a separate CSV file (dd-mm-yyyy.csv)")
         
+        if st.button("🔄 Rescan Files", help="Rebuild the file index after adding or removing daily files by hand"):
+            success, message = st.session_state.csv_manager.rebuild_attendance_manifest()
+            if success:
+                st.success(message)
+            else:
+                st.error(message)
+        
         # Get daily files information
         files_info = st.session_state.csv_manager.get_daily_files_info()
         
@@ -966,7 +1008,35 @@ def show_settings():
         if new_threshold != current_threshold:
             st.session_state.face_system.set_confidence_threshold(new_threshold)
             st.success("Confidence threshold updated")
-        
+
+        current_scale = st.session_state.face_system.detection_scale
+        new_scale = st.select_slider(
+            "Detection Scale",
+            options=[0.25, 0.5, 0.75, 1.0],
+            value=current_scale if current_scale in (0.25, 0.5, 0.75, 1.0) else 1.0,
+            help="Frames are resized by this factor before face detection. Lower values are faster on high-resolution cameras; faces are still encoded at full resolution."
+        )
+
+        if new_scale != current_scale:
+            st.session_state.face_system.set_detection_scale(new_scale)
+            st.success("Detection scale updated")
+
+        detectors = available_detectors() or [DEFAULT_DETECTOR]
+        current_detector = st.session_state.face_system.detector
+        new_detector = st.selectbox(
+            "Face Detector",
+            detectors,
+            index=detectors.index(current_detector) if current_detector in detectors else 0,
+            help="hog is fast on CPU, cnn is the most accurate but slow without a GPU, opencv_dnn needs the model files in models/. Run benchmarks/detector_benchmark.py to pick one for this machine."
+        )
+
+        if new_detector != current_detector:
+            success, message = st.session_state.face_system.set_detector(new_detector)
+            if success:
+                st.success(message)
+            else:
+                st.error(message)
+
         # Backup settings
         st.write("**Data Backup**")
         
@@ -0,0 +1,108 @@
+import time
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class AttendanceAggregator:
+    """
+    Temporal voting and debounce between recognition results and attendance logging.
+
+    Each face track (or, without tracking, each recognized teacher) keeps a
+    sliding window of votes, one per fresh match. Results that only replay an
+    earlier match (a tracked face between re-encodings, or a static frame) are
+    not votes, so min_votes counts independent encodings rather than frames;
+    the window is long enough for a tracked face to be re-encoded min_votes
+    times. A teacher is confirmed once they hold at least min_votes votes and
+    min_vote_share of the track's window, after
+    which CSVManager.log_attendance is called exactly once. Confirmed teachers
+    go into a per-day set, so later sightings that day never touch the disk.
+    """
+
+    def __init__(self, csv_manager, window_seconds: float = 10.0, min_votes: int = 3,
+                 min_vote_share: float = 0.6):
+        self.csv_manager = csv_manager
+        self.window_seconds = window_seconds
+        self.min_votes = min_votes
+        self.min_vote_share = min_vote_share
+
+        # key -> deque of (timestamp, teacher_id or None, confidence)
+        self._votes: Dict[object, deque] = {}
+        self._confirmed: Set[str] = set()
+        self._day: Optional[date] = None
+
+    def _roll_day(self, day: date):
+        """Start a new day: forget votes and seed confirmations from the day's marked teachers"""
+        if day == self._day:
+            return
+        self._day = day
+        self._votes = {}
+        self._confirmed = self.csv_manager.get_marked_teacher_ids(day)
+
+    def is_confirmed(self, teacher_id: str) -> bool:
+        return teacher_id in self._confirmed
+
+    def add_results(self, results: List[Dict], timestamp: Optional[float] = None,
+                    is_holiday: bool = False, holiday_name: str = "") -> List[Tuple[str, bool, str]]:
+        """Add one frame's recognition results; returns (teacher_id, success, message) per log call made"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self._roll_day(date.fromtimestamp(timestamp))
+
+        touched = set()
+        for result in results:
+            if not result.get('fresh', True):
+                continue
+            teacher_id = result['teacher_id'] if result['is_recognized'] else None
+            key = result.get('track_id')
+            if key is None:
+                # Without tracking, unrecognized faces cannot be attributed to anyone
+                if teacher_id is None:
+                    continue
+                key = teacher_id
+            if teacher_id is not None and teacher_id in self._confirmed and key == teacher_id:
+                continue
+            self._votes.setdefault(key, deque()).append((timestamp, teacher_id, result['confidence']))
+            touched.add(key)
+
+        # Drop votes that fell out of the window, and windows that emptied
+        horizon = timestamp - self.window_seconds
+        for key in list(self._votes):
+            window = self._votes[key]
+            while window and window[0][0] < horizon:
+                window.popleft()
+            if not window:
+                del self._votes[key]
+
+        logged = []
+        for key in touched:
+            if key not in self._votes:
+                continue
+            outcome = self._confirm(key, is_holiday, holiday_name)
+            if outcome is not None:
+                logged.append(outcome)
+        return logged
+
+    def _confirm(self, key, is_holiday: bool, holiday_name: str) -> Optional[Tuple[str, bool, str]]:
+        window = self._votes[key]
+        tallies: Dict[str, List[float]] = {}
+        for _, teacher_id, confidence in window:
+            if teacher_id is not None:
+                tallies.setdefault(teacher_id, []).append(confidence)
+        if not tallies:
+            return None
+
+        teacher_id, confidences = max(tallies.items(), key=lambda item: len(item[1]))
+        if teacher_id in self._confirmed:
+            return None
+        if len(confidences) < self.min_votes or len(confidences) < self.min_vote_share * len(window):
+            return None
+
+        success, message = self.csv_manager.log_attendance(
+            teacher_id, sum(confidences) / len(confidences), is_holiday, holiday_name)
+        # A failure may just mean the teacher was marked elsewhere (another session or
+        # process); ask the CSV manager rather than interpreting the message
+        if success or teacher_id in self.csv_manager.get_marked_teacher_ids(self._day):
+            self._confirmed.add(teacher_id)
+        # Either way the window is spent; a failed write needs a fresh window to retry
+        del self._votes[key]
+        return teacher_id, success, message
@@ -0,0 +1,188 @@
+import csv
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from attendance_writer import file_lock
+
+MANIFEST_FILE = "manifest.json"
+
+
+def _count_rows(file_path: str) -> int:
+    """Number of records in a daily CSV (lines after the header, honouring quoted fields)"""
+    try:
+        with open(file_path, 'r', newline='') as f:
+            return max(0, sum(1 for _ in csv.reader(f)) - 1)
+    except Exception:
+        return 0
+
+
+class AttendanceManifest:
+    """
+    Sidecar index of the daily attendance files in one directory.
+
+    manifest.json maps each ISO date that has a dd-mm-YYYY.csv file to its
+    filename, row count, size and mtime. CSVManager updates it after every
+    append, so date-range queries and the file listing only touch files that
+    exist instead of probing every calendar day. It is rebuilt from a
+    directory scan if missing or unreadable, and can be rebuilt on demand.
+    """
+
+    # Serializes updates within this process; the lock file covers other processes
+    _thread_lock = threading.RLock()
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.lock_path = self.path + ".lock"
+        self.entries: Dict[str, Dict] = {}
+        self._loaded_mtime = None
+        self._directory_mtime = None
+
+    def _file_entry(self, filename: str, rows: Optional[int] = None) -> Dict:
+        file_path = os.path.join(self.directory, filename)
+        stat = os.stat(file_path)
+        return {
+            'filename': filename,
+            'rows': _count_rows(file_path) if rows is None else rows,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime
+        }
+
+    def _save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self._loaded_mtime = os.path.getmtime(self.path)
+
+    def _daily_files(self) -> Dict[str, str]:
+        """Filenames of the dd-mm-YYYY.csv files in the directory, keyed by ISO date"""
+        files = {}
+        if os.path.exists(self.directory):
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.csv'):
+                    continue
+                try:
+                    file_date = datetime.strptime(filename[:-4], '%d-%m-%Y').date()
+                except ValueError:
+                    continue
+                files[file_date.isoformat()] = filename
+        return files
+
+    def _scan(self) -> Dict[str, Dict]:
+        return {key: self._file_entry(filename) for key, filename in self._daily_files().items()}
+
+    def _sync_directory(self):
+        """Add daily files created, and drop ones deleted, without going through record_append.
+
+        Only runs when the directory's mtime changed since the last check, and
+        only new files are counted.
+        """
+        try:
+            directory_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+        if directory_mtime == self._directory_mtime:
+            return
+
+        with file_lock(self.lock_path):
+            self._load(force=True)
+            files = self._daily_files()
+            changed = False
+            for key in list(self.entries):
+                if key not in files:
+                    del self.entries[key]
+                    changed = True
+            for key, filename in files.items():
+                if key not in self.entries:
+                    self.entries[key] = self._file_entry(filename)
+                    changed = True
+            if changed:
+                self._save()
+            # Taken after saving: replacing manifest.json changes the directory too
+            self._directory_mtime = os.stat(self.directory).st_mtime_ns
+
+    def _load(self, force: bool = False) -> bool:
+        """Read the manifest if it changed since last loaded; False if missing or unreadable"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            if force or mtime != self._loaded_mtime:
+                with open(self.path, 'r') as f:
+                    self.entries = json.load(f)
+                self._loaded_mtime = mtime
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _refresh(self):
+        """Pick up changes written by other processes or made directly in the directory;
+        rebuild the manifest if it is missing"""
+        if not self._load():
+            with file_lock(self.lock_path):
+                self.entries = self._scan()
+                self._save()
+        self._sync_directory()
+
+    def rebuild(self) -> int:
+        """Re-create the manifest from a scan of the directory; returns the number of files found"""
+        with self._thread_lock, file_lock(self.lock_path):
+            self.entries = self._scan()
+            self._save()
+            return len(self.entries)
+
+    def record_append(self, target_date: date, filename: str, rows_added: int = 1):
+        """Update the entry for a daily file after rows were appended to it"""
+        with self._thread_lock, file_lock(self.lock_path):
+            # Re-read under the lock, so updates from other processes are not lost
+            if not self._load(force=True):
+                # The scan already counts the rows just appended
+                self.entries = self._scan()
+            else:
+                key = target_date.isoformat()
+                entry = self.entries.get(key)
+                rows = entry['rows'] + rows_added if entry else None
+                self.entries[key] = self._file_entry(filename, rows)
+            self._save()
+
+    def files_between(self, start: date, end: date) -> List[Tuple[date, str]]:
+        """(date, path) of the existing daily files in [start, end], oldest first"""
+        with self._thread_lock:
+            self._refresh()
+            entries = dict(self.entries)
+        start_key, end_key = start.isoformat(), end.isoformat()
+        files = []
+        for key in sorted(entries):
+            if start_key <= key <= end_key:
+                file_path = os.path.join(self.directory, entries[key]['filename'])
+                # Deleted since the last directory check
+                if os.path.exists(file_path):
+                    files.append((date.fromisoformat(key), file_path))
+        return files
+
+    def files_info(self) -> Dict[str, Dict]:
+        """Entries keyed by ISO date; entries whose file changed on disk are recounted"""
+        with self._thread_lock:
+            self._refresh()
+            entries = dict(self.entries)
+
+        changed = False
+        for key, entry in list(entries.items()):
+            file_path = os.path.join(self.directory, entry['filename'])
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                del entries[key]
+                changed = True
+                continue
+            if stat.st_size != entry['size'] or stat.st_mtime != entry['mtime']:
+                entries[key] = self._file_entry(entry['filename'])
+                changed = True
+
+        if changed:
+            with self._thread_lock, file_lock(self.lock_path):
+                self.entries = entries
+                self._save()
+        return entries
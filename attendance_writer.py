@@ -0,0 +1,115 @@
+import csv
+import os
+import threading
+from contextlib import contextmanager
+from typing import IO, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+def _lock(f):
+    """Exclusive lock on an open file, shared with other processes (no-op where unsupported)"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive inter-process lock on a lock file (created if missing) for the with-block"""
+    with open(path, 'a') as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+class AttendanceWriter:
+    """
+    Append-only writer for the daily attendance CSV files.
+
+    Each record is appended as one CSV line under an exclusive file lock; the
+    header is written only when the file is empty (i.e. just created), so the
+    files stay identical to what pandas to_csv produced before. Writes are
+    flushed to the OS immediately and fsync'ed every fsync_every records
+    (1 = after every record, 0 = leave it to the OS).
+    """
+
+    # Serializes writers within this process; the file lock covers other processes
+    _thread_lock = threading.Lock()
+
+    def __init__(self, fsync_every: int = 1):
+        self.fsync_every = fsync_every
+        self._unsynced: Set[str] = set()
+        self._unsynced_count = 0
+
+    def append(self, path: str, columns: List[str], record: Dict,
+               skip_if: Optional[Callable[[IO], bool]] = None) -> Optional[Tuple[int, int]]:
+        """Append one record (missing columns are left empty).
+
+        skip_if, if given, is called with the open file, at its start, while
+        the locks are held; if it returns True nothing is written and None is
+        returned. Otherwise returns the file's (size, mtime_ns) right after the
+        write, taken before the lock is released, so it cannot include rows
+        appended by anyone else.
+        """
+        with self._thread_lock:
+            with open(path, 'a+', newline='') as f:
+                _lock(f)
+                try:
+                    if skip_if is not None:
+                        f.seek(0)
+                        if skip_if(f):
+                            return None
+                    writer = csv.writer(f, lineterminator='\n')
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() == 0:
+                        writer.writerow(columns)
+                    writer.writerow([record.get(column, '') for column in columns])
+                    f.flush()
+                    if self.fsync_every == 1:
+                        os.fsync(f.fileno())
+                    stat = os.fstat(f.fileno())
+                finally:
+                    _unlock(f)
+
+            if self.fsync_every > 1:
+                self._unsynced.add(path)
+                self._unsynced_count += 1
+                if self._unsynced_count >= self.fsync_every:
+                    self._sync_pending()
+            return stat.st_size, stat.st_mtime_ns
+
+    def sync(self):
+        """Force all batched writes to disk"""
+        with self._thread_lock:
+            self._sync_pending()
+
+    def _sync_pending(self):
+        for path in self._unsynced:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._unsynced = set()
+        self._unsynced_count = 0
@@ -0,0 +1,224 @@
+"""
+Offline recognition over recorded video files and image folders.
+
+Used to backfill attendance when the live camera service was down: frames are
+sampled from a CCTV recording (or read from a folder of snapshots), run through
+decode -> detect -> encode -> match on a process pool, and every recognized
+face is written out as a candidate attendance event with its timestamp.
+Nothing is logged to the attendance files; the events are for review.
+
+    python batch_recognition.py recording.mp4 --start "2026-10-16 07:30:00"
+    python batch_recognition.py snapshots/ --output data/batch_events/snapshots.csv
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from face_recognition_utils import FACE_RECOGNITION_AVAILABLE, FaceRecognitionSystem
+from frame_filters import MotionGate
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+EVENT_COLUMNS = ['Timestamp', 'Date', 'Time', 'Teacher_ID', 'Name', 'Confidence', 'Source', 'Frame']
+BATCH_EVENTS_DIR = "data/batch_events"
+
+# Recognition system of each worker process, built once by _init_worker
+_worker_system: Optional[FaceRecognitionSystem] = None
+
+
+def _init_worker(face_encodings: Dict, teacher_names: Dict, settings: Dict):
+    global _worker_system
+    _worker_system = FaceRecognitionSystem(**settings)
+    _worker_system.load_known_faces(face_encodings, teacher_names)
+
+
+def _frame_events(frame: np.ndarray, timestamp: datetime, source: str, frame_number: int,
+                  motion_gate: MotionGate) -> List[Dict]:
+    """Recognize one BGR frame; static frames (no motion since the last processed one) are skipped"""
+    if not motion_gate.has_motion(frame):
+        return []
+
+    events = []
+    # Pool workers have no page to report to: errors propagate to future.result()
+    for result in _worker_system.recognize_faces(frame, report_errors=False):
+        if result['is_recognized']:
+            events.append({
+                'Timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                'Date': timestamp.strftime('%Y-%m-%d'),
+                'Time': timestamp.strftime('%H:%M:%S'),
+                'Teacher_ID': result['teacher_id'],
+                'Name': result['teacher_name'],
+                'Confidence': round(result['confidence'], 4),
+                'Source': source,
+                'Frame': frame_number
+            })
+    return events
+
+
+def _process_video_chunk(path: str, first_frame: int, last_frame: int, step: int,
+                         fps: float, start_time: datetime) -> List[Dict]:
+    """Decode and recognize every step-th frame in [first_frame, last_frame) of a video"""
+    capture = cv2.VideoCapture(path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+    motion_gate = MotionGate()
+    source = os.path.basename(path)
+
+    events = []
+    try:
+        for frame_number in range(first_frame, last_frame):
+            # grab() skips decoding to BGR for frames that are not sampled
+            if not capture.grab():
+                break
+            if (frame_number - first_frame) % step:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            timestamp = start_time + timedelta(seconds=frame_number / fps)
+            events.extend(_frame_events(frame, timestamp, source, frame_number, motion_gate))
+    finally:
+        capture.release()
+    return events
+
+
+def _image_timestamp(path: str) -> datetime:
+    """Capture time from EXIF DateTime if present, otherwise the file modification time"""
+    try:
+        taken = Image.open(path).getexif().get(306)
+        if taken:
+            return datetime.strptime(taken, '%Y:%m:%d %H:%M:%S')
+    except Exception:
+        pass
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def _process_image_chunk(paths: List[str], first_number: int) -> List[Dict]:
+    """Decode and recognize a run of image files"""
+    motion_gate = MotionGate()
+    events = []
+    for frame_number, path in enumerate(paths, first_number):
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        events.extend(_frame_events(frame, _image_timestamp(path), os.path.basename(path),
+                                    frame_number, motion_gate))
+    return events
+
+
+def _video_tasks(path: str, sample_fps: float, start_time: Optional[datetime], chunk_seconds: float):
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+
+    if start_time is None:
+        # Recordings are usually closed when they end, so mtime marks the last frame
+        start_time = datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=frame_count / fps)
+
+    step = max(1, int(round(fps / sample_fps)))
+    chunk_frames = max(step, int(chunk_seconds * fps) // step * step)
+    return [(_process_video_chunk, (path, first, min(first + chunk_frames, frame_count), step, fps, start_time))
+            for first in range(0, frame_count, chunk_frames)]
+
+
+def _image_tasks(directory: str, chunk_size: int = 50):
+    paths = sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                   if f.lower().endswith(IMAGE_EXTENSIONS))
+    return [(_process_image_chunk, (paths[first:first + chunk_size], first))
+            for first in range(0, len(paths), chunk_size)]
+
+
+def run_batch_recognition(source: str, face_encodings: Dict[str, np.ndarray], teacher_names: Dict[str, str],
+                          output_path: Optional[str] = None, sample_fps: float = 2.0,
+                          start_time: Optional[datetime] = None, max_workers: Optional[int] = None,
+                          chunk_seconds: float = 60.0, confidence_threshold: float = 0.6,
+                          detection_scale: Optional[float] = None, detector: str = "auto") -> Tuple[bool, pd.DataFrame, str]:
+    """Recognize every sampled frame of a video file or image folder.
+
+    Returns (success, events, message); events are also written to output_path
+    as CSV, one row per recognized face, sorted by timestamp.
+    """
+    if cv2 is None:
+        return False, pd.DataFrame(columns=EVENT_COLUMNS), "OpenCV is required for batch recognition"
+    if not FACE_RECOGNITION_AVAILABLE:
+        return False, pd.DataFrame(columns=EVENT_COLUMNS), "face_recognition is required for batch recognition"
+    if not face_encodings:
+        return False, pd.DataFrame(columns=EVENT_COLUMNS), "No enrolled teachers to match against"
+
+    try:
+        if os.path.isdir(source):
+            tasks = _image_tasks(source)
+        else:
+            tasks = _video_tasks(source, sample_fps, start_time, chunk_seconds)
+        if not tasks:
+            return False, pd.DataFrame(columns=EVENT_COLUMNS), f"No frames found in {source}"
+
+        settings = {'confidence_threshold': confidence_threshold, 'detection_scale': detection_scale,
+                    'detector': detector}
+        workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(face_encodings, teacher_names, settings)) as pool:
+            futures = [pool.submit(function, *args) for function, args in tasks]
+            events = [event for future in futures for event in future.result()]
+
+        events_df = pd.DataFrame(events, columns=EVENT_COLUMNS).sort_values(['Timestamp', 'Frame'])
+
+        if output_path is None:
+            name = os.path.splitext(os.path.basename(os.path.normpath(source)))[0]
+            output_path = os.path.join(BATCH_EVENTS_DIR, f"{name}_events.csv")
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        events_df.to_csv(output_path, index=False)
+
+        return True, events_df, f"{len(events_df)} candidate events written to {output_path}"
+
+    except Exception as e:
+        return False, pd.DataFrame(columns=EVENT_COLUMNS), f"Error in batch recognition: {str(e)}"
+
+
+def main():
+    from csv_manager import CSVManager
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="video file or folder of images")
+    parser.add_argument("--output", help=f"events CSV (default {BATCH_EVENTS_DIR}/<source>_events.csv)")
+    parser.add_argument("--start", help="wall-clock time of the first video frame, 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument("--sample-fps", type=float, default=2.0, help="video frames recognized per second")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--confidence", type=float, default=0.6)
+    parser.add_argument("--detection-scale", type=float, default=None,
+                        help="default: the scale the saved detector was benchmarked at, else 1.0")
+    parser.add_argument("--detector", default="auto")
+    args = parser.parse_args()
+
+    csv_manager = CSVManager()
+    face_encodings = csv_manager.get_teacher_face_encodings()
+    teachers_df = csv_manager.get_all_teachers()
+    teacher_names = dict(zip(teachers_df['ID'], teachers_df['Name'])) if not teachers_df.empty else {}
+    start_time = datetime.strptime(args.start, '%Y-%m-%d %H:%M:%S') if args.start else None
+
+    success, events_df, message = run_batch_recognition(
+        args.source, face_encodings, teacher_names, args.output, args.sample_fps, start_time,
+        args.workers, confidence_threshold=args.confidence, detection_scale=args.detection_scale,
+        detector=args.detector)
+    print(message)
+
+    if success and not events_df.empty:
+        # First sighting of each teacher = candidate arrival time
+        arrivals = events_df.groupby(['Date', 'Teacher_ID', 'Name'], as_index=False)['Time'].min()
+        print(arrivals.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Date-range read benchmark for the daily attendance files.
+
+Writes a synthetic attendance history (5 years of school days by default,
+one dd-mm-YYYY.csv per day) to a temporary directory, then compares the old
+serial path (one pd.read_csv per calendar day, then concat) with
+read_attendance_files over the manifest's file list, for several range lengths.
+
+    python benchmarks/attendance_range_benchmark.py
+    python benchmarks/attendance_range_benchmark.py --years 5 --teachers 80 --workers 4 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_manifest import AttendanceManifest
+from csv_manager import ATTENDANCE_COLUMNS, read_attendance_files
+
+
+def write_history(directory: str, end: date, years: int, n_teachers: int, seed: int = 0) -> int:
+    """One file per weekday with ~90% of teachers present; returns the number of files written"""
+    rng = random.Random(seed)
+    day = end - timedelta(days=365 * years)
+    n_files = 0
+    while day <= end:
+        if day.weekday() < 5:
+            rows = []
+            for i in range(n_teachers):
+                if rng.random() < 0.9:
+                    rows.append([day.isoformat(), f"T{i:03d}", f"Teacher {i}",
+                                 f"08:{rng.randint(30, 59):02d}:{rng.randint(0, 59):02d}", 'Present',
+                                 False, '', round(rng.uniform(0.6, 0.99), 4)])
+            pd.DataFrame(rows, columns=ATTENDANCE_COLUMNS).to_csv(
+                os.path.join(directory, f"{day.strftime('%d-%m-%Y')}.csv"), index=False)
+            n_files += 1
+        day += timedelta(days=1)
+    return n_files
+
+
+def serial_read(directory: str, start: date, end: date) -> pd.DataFrame:
+    """The previous get_attendance_by_date_range: probe and parse every calendar day"""
+    frames = []
+    day = start
+    while day <= end:
+        file_path = os.path.join(directory, f"{day.strftime('%d-%m-%Y')}.csv")
+        if os.path.exists(file_path):
+            df = pd.read_csv(file_path)
+            if not df.empty:
+                frames.append(df)
+        day += timedelta(days=1)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def best_of(function, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--ranges", type=int, nargs="+", default=[30, 365, 1825], help="range lengths in days")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    end = date.today()
+    with tempfile.TemporaryDirectory() as directory:
+        n_files = write_history(directory, end, args.years, args.teachers)
+        manifest = AttendanceManifest(directory)
+        manifest.rebuild()
+        print(f"{n_files} daily files, {args.teachers} teachers")
+
+        print(f"{'days':>6} {'files':>6} {'rows':>8} {'reader':>10} {'ms':>9} {'speedup':>8}")
+        for days in args.ranges:
+            start = end - timedelta(days=days)
+            serial_s, reference = best_of(lambda: serial_read(directory, start, end), args.repeat)
+            paths = [file_path for _, file_path in manifest.files_between(start, end)]
+            print(f"{days:>6} {len(paths):>6} {len(reference):>8} {'serial':>10} {1000 * serial_s:>9.1f} {1.0:>8.1f}")
+
+            for workers in args.workers:
+                elapsed, result = best_of(
+                    lambda: read_attendance_files(
+                        [file_path for _, file_path in manifest.files_between(start, end)], workers),
+                    args.repeat)
+                assert len(result) == len(reference)
+                assert (result['Teacher_ID'].values == reference['Teacher_ID'].values).all()
+                label = f"joined/{workers}"
+                print(f"{days:>6} {len(paths):>6} {len(result):>8} {label:>10} {1000 * elapsed:>9.1f} "
+                      f"{serial_s / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Speed and recall benchmark for the face detector backends.
+
+Runs every available detector (dlib HOG, dlib CNN, OpenCV DNN) over a folder
+of frames from the kiosk camera, then picks the fastest one whose recall meets
+the floor. Ground truth comes from a labels file if given, otherwise from the
+reference detector (CNN by default) at full resolution. A detection counts as
+found when it overlaps a ground-truth box with IoU >= 0.5.
+
+    python benchmarks/detector_benchmark.py --images samples/frames
+    python benchmarks/detector_benchmark.py --images samples/frames --labels labels.json --recall-floor 0.95
+    python benchmarks/detector_benchmark.py --images samples/frames --scale 0.5 --save
+
+The labels file maps image file names to lists of [top, right, bottom, left]
+boxes. --save writes the pick and the --scale it was measured at to
+data/detector_settings.json, which FaceRecognitionSystem(detector="auto")
+reads on startup, so the detector runs at the scale that met the floor.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_detectors import get_detector, available_detectors, save_detector_choice
+from face_recognition_utils import locate_faces
+from face_tracker import box_iou
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+MIN_IOU = 0.5
+
+
+def load_images(directory: str, limit: int):
+    """Load up to limit images from a directory as RGB arrays, keyed by file name"""
+    names = sorted(f for f in os.listdir(directory) if f.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    return {name: np.array(Image.open(os.path.join(directory, name)).convert('RGB')) for name in names}
+
+
+def count_hits(truth, found):
+    """Number of ground-truth boxes matched by a distinct detection"""
+    hits, used = 0, set()
+    for box in truth:
+        overlaps = [(box_iou(box, other), j) for j, other in enumerate(found) if j not in used]
+        if overlaps:
+            iou, j = max(overlaps)
+            if iou >= MIN_IOU:
+                hits += 1
+                used.add(j)
+    return hits
+
+
+def run_detector(name: str, images, truth, scale: float, repeat: int):
+    """Return (ms per image, recall, false positives per image) for one backend"""
+    locate_faces(next(iter(images.values())), scale, name)  # warm up (loads DNN weights)
+    hits = total = false_positives = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for image_name, image in images.items():
+            found = locate_faces(image, scale, name)
+            matched = count_hits(truth[image_name], found)
+            hits += matched
+            total += len(truth[image_name])
+            false_positives += len(found) - matched
+    elapsed = time.perf_counter() - start
+    runs = repeat * len(images)
+    recall = hits / total if total else 1.0
+    return 1000.0 * elapsed / runs, recall, false_positives / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="folder of camera frames containing faces")
+    parser.add_argument("--labels", help="JSON file with ground-truth boxes per image")
+    parser.add_argument("--reference", default="cnn", help="detector used as ground truth without --labels")
+    parser.add_argument("--scale", type=float, default=1.0, help="detection scale to benchmark at")
+    parser.add_argument("--recall-floor", type=float, default=0.9)
+    parser.add_argument("--limit", type=int, default=100, help="maximum number of images")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--save", action="store_true", help="save the pick for FaceRecognitionSystem")
+    args = parser.parse_args()
+
+    detectors = available_detectors()
+    if not detectors:
+        sys.exit("No face detector backend is available (install face_recognition or add the DNN model files)")
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        sys.exit(f"No images found in {args.images}")
+
+    if args.labels:
+        with open(args.labels, 'r') as f:
+            labels = json.load(f)
+        truth = {name: [tuple(box) for box in labels.get(name, [])] for name in images}
+    else:
+        if args.reference not in detectors:
+            sys.exit(f"Reference detector '{args.reference}' is not available; pass --labels instead")
+        reference = get_detector(args.reference)
+        truth = {name: reference.detect(image) for name, image in images.items()}
+    print(f"{len(images)} images, {sum(len(boxes) for boxes in truth.values())} ground-truth faces, "
+          f"scale {args.scale}")
+
+    results = {}
+    print(f"{'detector':>11} {'ms/image':>9} {'recall':>7} {'FP/image':>9}")
+    for name in detectors:
+        ms, recall, false_positives = run_detector(name, images, truth, args.scale, args.repeat)
+        results[name] = {'ms_per_image': round(ms, 2), 'recall': round(recall, 4),
+                         'false_positives_per_image': round(false_positives, 3)}
+        print(f"{name:>11} {ms:>9.1f} {recall:>7.3f} {false_positives:>9.2f}")
+
+    eligible = [name for name in results if results[name]['recall'] >= args.recall_floor]
+    if not eligible:
+        sys.exit(f"No detector reaches recall {args.recall_floor}")
+
+    best = min(eligible, key=lambda name: results[name]['ms_per_image'])
+    print(f"Fastest detector with recall >= {args.recall_floor}: {best}")
+    if args.save and save_detector_choice(best, results, args.scale):
+        print("Saved to data/detector_settings.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Accuracy and speed report for reduced-precision galleries.
+
+Matches genuine probes (enrolled identities) and impostor probes (identities
+not in the gallery) against float64, float32 and int8 galleries, and reports
+how often the match decision (teacher ID, or Unknown beyond the tolerance)
+agrees with float64, together with gallery memory and scan latency.
+
+    python benchmarks/precision_benchmark.py
+    python benchmarks/precision_benchmark.py --sizes 1000 50000 --tolerance 0.4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery_index import BruteForceIndex, ENCODING_SIZE, PRECISIONS
+from gallery_index_benchmark import synthetic_gallery
+
+
+def probes(identities: np.ndarray, truth: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Noisy probe shots of the given identities, with the same noise as synthetic_gallery"""
+    return identities[truth] + rng.normal(0.0, 0.35 / np.sqrt(ENCODING_SIZE), (len(truth), ENCODING_SIZE))
+
+
+def decisions(index: BruteForceIndex, queries: np.ndarray, tolerance: float):
+    """Return (best row or -1 for Unknown, best distance, ms per query) for one-face-at-a-time search"""
+    rows = np.empty(len(queries), dtype=np.int64)
+    distances = np.empty(len(queries))
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        found_distances, found = index.search(query, 1)
+        rows[i], distances[i] = found[0, 0], found_distances[0, 0]
+    elapsed = time.perf_counter() - start
+    rows[distances > tolerance] = -1
+    return rows, distances, 1000.0 * elapsed / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--tolerance", type=float, default=0.4,
+                        help="match tolerance, i.e. 1 - confidence threshold (default 0.4)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'gallery':>8} {'precision':>9} {'MB':>8} {'ms/query':>9} {'agreement':>10} {'max |dd|':>9}")
+    for size in args.sizes:
+        # One population of size + n_impostor identities: genuine probes come from
+        # the first size (enrolled), impostor probes from the rest (left out)
+        n_genuine = args.queries // 2
+        n_impostor = args.queries - n_genuine
+        ids, identities, _ = synthetic_gallery(size + n_impostor, 0, args.seed)
+        rng = np.random.default_rng(args.seed + 1)
+        genuine = probes(identities, rng.integers(0, size, n_genuine), rng)
+        impostors = probes(identities, np.arange(size, size + n_impostor), rng)
+        queries = np.vstack([genuine, impostors])
+        ids, matrix = ids[:size], identities[:size]
+
+        reference = None
+        for precision in PRECISIONS:
+            index = BruteForceIndex(ids, matrix, precision)
+            rows, distances, ms = decisions(index, queries, args.tolerance)
+            if reference is None:
+                reference = (rows, distances)
+            agreement = np.mean(rows == reference[0])
+            max_error = np.max(np.abs(distances - reference[1]))
+            megabytes = index.vectors.nbytes / 1e6
+            print(f"{size:>8} {precision:>9} {megabytes:>8.2f} {ms:>9.3f} {agreement:>10.4f} {max_error:>9.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,79 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime, date
-import pickle
 import shutil
-from typing import Dict, List, Optional, Tuple
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
 import streamlit as st
 import json
 
+from encoding_store import EncodingStore
+from shared_gallery import get_shared_gallery
+from attendance_writer import AttendanceWriter
+from attendance_manifest import AttendanceManifest
+
+# Columns of the daily attendance files (data/daily_attendance/dd-mm-YYYY.csv)
+ATTENDANCE_COLUMNS = ['Date', 'Teacher_ID', 'Name', 'Time_In', 'Status',
+                      'Is_Holiday', 'Holiday_Name', 'Recognition_Confidence']
+
+# Fixed dtypes, so every day parses the same way whatever its contents
+ATTENDANCE_DTYPES = {'Date': str, 'Teacher_ID': str, 'Name': str, 'Time_In': str, 'Status': str,
+                     'Is_Holiday': 'boolean', 'Holiday_Name': str, 'Recognition_Confidence': float}
+
+def _read_bytes(file_path: str) -> bytes:
+    """Contents of a file, or b'' if it was deleted after being listed"""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b''
+
+def read_attendance_files(file_paths: List[str], max_workers: int = 1) -> pd.DataFrame:
+    """Read many daily attendance files into one DataFrame.
+    
+    File bodies are joined under a single header and parsed with one read_csv
+    call, instead of one parse and one concat per day. Files with a different
+    header are parsed on their own. max_workers > 1 fetches the files on a
+    thread pool, which only helps on slow (e.g. network) storage.
+    """
+    if not file_paths:
+        return pd.DataFrame()
+    
+    if max_workers > 1 and len(file_paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(file_paths))) as pool:
+            contents = list(pool.map(_read_bytes, file_paths))
+    else:
+        contents = [_read_bytes(file_path) for file_path in file_paths]
+    
+    header = ','.join(ATTENDANCE_COLUMNS).encode()
+    bodies, other_files = [], []
+    for file_path, data in zip(file_paths, contents):
+        first_line, _, body = data.partition(b'\n')
+        if first_line.rstrip(b'\r') != header:
+            if data.strip():
+                other_files.append(file_path)
+        elif body:
+            bodies.append(body if body.endswith(b'\n') else body + b'\n')
+    
+    frames = []
+    if bodies:
+        frames.append(pd.read_csv(io.BytesIO(header + b'\n' + b''.join(bodies)), dtype=ATTENDANCE_DTYPES))
+    frames.extend(pd.read_csv(file_path, dtype=ATTENDANCE_DTYPES) for file_path in other_files)
+    
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True).sort_values('Date', kind='stable', ignore_index=True)
+
 class CSVManager:
     """
     CSV-based storage manager for Smart Kids Attendance System
     Saves daily attendance records in date-named CSV files
     """
     
-    def __init__(self):
+    def __init__(self, attendance_fsync_every: int = 1):
         # Directory structure
         self.data_dir = "data"
         self.teachers_file = "data/teachers.csv"
@@ -28,8 +88,31 @@ class CSVManager:
         os.makedirs(self.backup_dir, exist_ok=True)
         os.makedirs(self.daily_attendance_dir, exist_ok=True)
         
+        # Cached teachers.csv with an ID -> row index; reloaded when the file's
+        # (size, mtime) changes or _teachers_version is bumped by our own writes
+        self._teachers_df: Optional[pd.DataFrame] = None
+        self._teachers_by_id: Dict[str, Dict] = {}
+        self._teachers_signature = None
+        self._teachers_version = 0
+        
         # Initialize teachers file if it doesn't exist
         self._initialize_teachers_file()
+        
+        # Face encodings live in one memory-mapped store
+        self.encoding_store = EncodingStore(self.face_encodings_dir)
+        self._migrate_legacy_encodings()
+        
+        # Attendance marks are appended to the daily file, fsync'ed every N marks
+        self.attendance_writer = AttendanceWriter(attendance_fsync_every)
+        
+        # Sidecar index of the existing daily files, so range queries skip missing days
+        self.attendance_manifest = AttendanceManifest(self.daily_attendance_dir)
+        
+        # Teacher IDs already marked on _marked_day, with the (size, mtime) of the
+        # day file they were read from; reseeded only if the file changed behind our back
+        self._marked_day: Optional[date] = None
+        self._marked_ids: Set[str] = set()
+        self._marked_signature = None
     
     def _initialize_teachers_file(self):
         """Initialize teachers CSV file with headers if it doesn't exist"""
@@ -39,8 +122,26 @@ class CSVManager:
                 'Face_Encoding_Path', 'Status', 'Email'
             ])
             teachers_df.to_csv(self.teachers_file, index=False)
+            self._teachers_version += 1
             st.success("✅ Created teachers CSV file")
     
+    def _migrate_legacy_encodings(self):
+        """Import per-teacher pickle files from older versions into the encoding store once"""
+        if os.path.exists(self.encoding_store.matrix_path) or os.path.exists(self.encoding_store.log_path):
+            return
+        
+        try:
+            teachers_df = self.get_all_teachers()
+            if teachers_df.empty:
+                return
+            
+            encoding_paths = dict(zip(teachers_df['ID'], teachers_df['Face_Encoding_Path']))
+            imported = self.encoding_store.import_legacy_pickles(encoding_paths)
+            if imported:
+                st.success(f"✅ Migrated {len(imported)} face encodings to {self.encoding_store.matrix_path}")
+        except Exception as e:
+            st.warning(f"Could not migrate legacy face encodings: {str(e)}")
+    
     def _get_daily_attendance_file(self, target_date: date = None) -> str:
         """Get the CSV file path for a specific date"""
         if target_date is None:
@@ -51,26 +152,25 @@ class CSVManager:
     
     def add_teacher(self, teacher_id: str, name: str, department: str, 
                    face_encoding: np.ndarray, email: str = "") -> Tuple[bool, str]:
-        """Add a new teacher to CSV storage"""
+        """Add a new teacher to CSV storage (face_encoding may hold several templates, one per row)"""
         try:
-            # Save face encoding
-            encoding_path = f"{self.face_encodings_dir}/{teacher_id}.pkl"
-            with open(encoding_path, 'wb') as f:
-                pickle.dump(face_encoding, f)
+            encoding_path = self.encoding_store.matrix_path
             
             # Load existing teachers
-            if os.path.exists(self.teachers_file):
-                teachers_df = pd.read_csv(self.teachers_file)
-            else:
+            teachers_df = self._teacher_registry()
+            if teachers_df.empty:
                 teachers_df = pd.DataFrame(columns=[
                     'ID', 'Name', 'Department', 'Registration_Date', 
                     'Face_Encoding_Path', 'Status', 'Email'
                 ])
             
             # Check if teacher already exists
-            if teacher_id in teachers_df['ID'].values:
+            if str(teacher_id) in self._teachers_by_id:
                 return False, "Teacher ID already exists"
             
+            # Save face encoding
+            self.encoding_store.add(str(teacher_id), face_encoding)
+            
             # Add new teacher
             new_teacher = {
                 'ID': teacher_id,
@@ -84,39 +184,100 @@ class CSVManager:
             
             teachers_df = pd.concat([teachers_df, pd.DataFrame([new_teacher])], ignore_index=True)
             teachers_df.to_csv(self.teachers_file, index=False)
+            self._teachers_version += 1
+            get_shared_gallery().bump_version()
             
             return True, f"Teacher {name} added successfully to CSV"
             
         except Exception as e:
             return False, f"Error adding teacher: {str(e)}"
     
+    def _teacher_registry(self) -> pd.DataFrame:
+        """Cached teachers DataFrame (not a copy, do not modify); reloads only if the file changed"""
+        try:
+            stat = os.stat(self.teachers_file)
+            signature = (stat.st_size, stat.st_mtime_ns, self._teachers_version)
+        except OSError:
+            signature = None
+        
+        if self._teachers_df is None or signature != self._teachers_signature:
+            # IDs stay strings (e.g. "101"), matching the encoding store and attendance files
+            teachers_df = pd.read_csv(self.teachers_file, dtype={'ID': str}) if signature is not None else pd.DataFrame()
+            self._teachers_by_id = {str(teacher['ID']): teacher for teacher in teachers_df.to_dict('records')} \
+                if not teachers_df.empty else {}
+            self._teachers_df = teachers_df
+            self._teachers_signature = signature
+        
+        return self._teachers_df
+    
+    def get_teacher(self, teacher_id: str) -> Optional[Dict]:
+        """Look up one teacher's row by ID (a dictionary hit on the cached registry)"""
+        try:
+            self._teacher_registry()
+            return self._teachers_by_id.get(str(teacher_id))
+        except Exception as e:
+            st.error(f"Error loading teachers: {str(e)}")
+            return None
+    
     def get_all_teachers(self) -> pd.DataFrame:
         """Get all teachers from CSV"""
         try:
-            if os.path.exists(self.teachers_file):
-                return pd.read_csv(self.teachers_file)
-            else:
-                return pd.DataFrame()
+            return self._teacher_registry().copy()
         except Exception as e:
             st.error(f"Error loading teachers: {str(e)}")
             return pd.DataFrame()
     
     def get_teacher_face_encodings(self) -> Dict[str, np.ndarray]:
         """Load all teacher face encodings"""
-        encodings = {}
-        teachers_df = self.get_all_teachers()
+        try:
+            teachers_df = self._teacher_registry()
+            if teachers_df.empty:
+                return {}
+            
+            active_ids = set(teachers_df.loc[teachers_df['Status'] == 'Active', 'ID'].astype(str))
+            encodings = self.encoding_store.get_encodings()
+            return {teacher_id: encoding for teacher_id, encoding in encodings.items() if teacher_id in active_ids}
+        except Exception as e:
+            st.warning(f"Could not load face encodings: {str(e)}")
+            return {}
+    
+    def _day_file_signature(self, attendance_file: str):
+        try:
+            stat = os.stat(attendance_file)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+    
+    def _marked_ids_for(self, target_date: date, day_file=None) -> Set[str]:
+        """In-memory set of teacher IDs marked on target_date, re-read only when the day file changed.
         
-        for _, teacher in teachers_df.iterrows():
-            if teacher['Status'] == 'Active':
-                try:
-                    encoding_path = teacher['Face_Encoding_Path']
-                    if os.path.exists(encoding_path):
-                        with open(encoding_path, 'rb') as f:
-                            encodings[teacher['ID']] = pickle.load(f)
-                except Exception as e:
-                    st.warning(f"Could not load encoding for {teacher['Name']}: {str(e)}")
+        day_file may be the day's file already open for reading (e.g. under the writer's lock).
+        """
+        if day_file is None:
+            source = self._get_daily_attendance_file(target_date)
+            signature = self._day_file_signature(source)
+        else:
+            source = day_file
+            stat = os.fstat(day_file.fileno())
+            signature = stat.st_size, stat.st_mtime_ns
         
-        return encodings
+        if target_date != self._marked_day or signature != self._marked_signature:
+            marked_ids = set()
+            if signature is not None and signature[0] > 0:
+                marked_ids = set(pd.read_csv(source, usecols=['Teacher_ID'], dtype=str)['Teacher_ID'])
+            self._marked_day = target_date
+            self._marked_ids = marked_ids
+            self._marked_signature = signature
+        
+        return self._marked_ids
+    
+    def get_marked_teacher_ids(self, target_date: date = None) -> Set[str]:
+        """Teacher IDs with attendance on a date (today by default)"""
+        try:
+            return set(self._marked_ids_for(target_date or date.today()))
+        except Exception as e:
+            st.error(f"Error loading marked teachers: {str(e)}")
+            return set()
     
     def log_attendance(self, teacher_id: str, confidence: float, 
                       is_holiday: bool = False, holiday_name: str = "") -> Tuple[bool, str]:
@@ -125,36 +286,20 @@ class CSVManager:
             today = date.today()
             current_time = datetime.now().strftime('%H:%M:%S')
             
-            # Get teacher name
-            teachers_df = self.get_all_teachers()
-            teacher_row = teachers_df[teachers_df['ID'] == teacher_id]
+            # Check if already marked today: a set lookup, no disk read
+            if str(teacher_id) in self._marked_ids_for(today):
+                return False, "Attendance already marked for today"
             
-            if teacher_row.empty:
+            # Get teacher name
+            teacher = self.get_teacher(teacher_id)
+            if teacher is None:
                 return False, "Teacher not found"
             
-            teacher_name = teacher_row['Name'].iloc[0]
+            teacher_name = teacher['Name']
             
             # Get today's attendance file
             attendance_file = self._get_daily_attendance_file(today)
             
-            # Load or create today's attendance
-            if os.path.exists(attendance_file):
-                attendance_df = pd.read_csv(attendance_file)
-            else:
-                attendance_df = pd.DataFrame(columns=[
-                    'Date', 'Teacher_ID', 'Name', 'Time_In', 'Status', 
-                    'Is_Holiday', 'Holiday_Name', 'Recognition_Confidence'
-                ])
-            
-            # Check if already marked today
-            existing_record = attendance_df[
-                (attendance_df['Teacher_ID'] == teacher_id) & 
-                (attendance_df['Date'] == today.strftime('%Y-%m-%d'))
-            ]
-            
-            if not existing_record.empty:
-                return False, "Attendance already marked for today"
-            
             # Add attendance record
             attendance_record = {
                 'Date': today.strftime('%Y-%m-%d'),
@@ -167,8 +312,19 @@ class CSVManager:
                 'Recognition_Confidence': confidence
             }
             
-            attendance_df = pd.concat([attendance_df, pd.DataFrame([attendance_record])], ignore_index=True)
-            attendance_df.to_csv(attendance_file, index=False)
+            # Append one line; the header is only written when the file is created.
+            # The check is repeated under the writer's lock, as another session or
+            # process may have marked the teacher since the check above
+            signature = self.attendance_writer.append(
+                attendance_file, ATTENDANCE_COLUMNS, attendance_record,
+                skip_if=lambda day_file: str(teacher_id) in self._marked_ids_for(today, day_file))
+            if signature is None:
+                return False, "Attendance already marked for today"
+            # The signature was taken under the writer's lock: a row appended by
+            # someone else afterwards changes it, so the set gets re-read
+            self._marked_ids.add(str(teacher_id))
+            self._marked_signature = signature
+            self.attendance_manifest.record_append(today, os.path.basename(attendance_file))
             
             return True, f"Attendance marked for {teacher_name} in {today.strftime('%d-%m-%Y')}.csv"
             
@@ -196,7 +352,7 @@ class CSVManager:
             attendance_file = self._get_daily_attendance_file(target_date)
             
             if os.path.exists(attendance_file):
-                return pd.read_csv(attendance_file)
+                return pd.read_csv(attendance_file, dtype=ATTENDANCE_DTYPES)
             else:
                 return pd.DataFrame()
                 
@@ -210,19 +366,9 @@ class CSVManager:
             start = datetime.strptime(start_date, '%Y-%m-%d').date()
             end = datetime.strptime(end_date, '%Y-%m-%d').date()
             
-            all_attendance = []
-            
-            current_date = start
-            while current_date <= end:
-                daily_attendance = self.get_attendance_by_date(current_date)
-                if not daily_attendance.empty:
-                    all_attendance.append(daily_attendance)
-                current_date += pd.Timedelta(days=1)
-            
-            if all_attendance:
-                return pd.concat(all_attendance, ignore_index=True)
-            else:
-                return pd.DataFrame()
+            # Only days that have a file, according to the manifest, read in one pass
+            file_paths = [file_path for _, file_path in self.attendance_manifest.files_between(start, end)]
+            return read_attendance_files(file_paths)
                 
         except Exception as e:
             st.error(f"Error loading attendance data: {str(e)}")
@@ -231,21 +377,8 @@ class CSVManager:
     def get_available_dates(self) -> List[str]:
         """Get list of dates with attendance records"""
         try:
-            available_dates = []
-            
-            if os.path.exists(self.daily_attendance_dir):
-                for filename in os.listdir(self.daily_attendance_dir):
-                    if filename.endswith('.csv'):
-                        # Extract date from filename (dd-mm-yyyy.csv)
-                        date_str = filename.replace('.csv', '')
-                        try:
-                            # Convert to standard format
-                            date_obj = datetime.strptime(date_str, '%d-%m-%Y')
-                            available_dates.append(date_obj.strftime('%Y-%m-%d'))
-                        except ValueError:
-                            continue
-            
-            return sorted(available_dates)
+            # Manifest keys are ISO dates (yyyy-mm-dd) of the existing dd-mm-yyyy.csv files
+            return sorted(self.attendance_manifest.files_info())
             
         except Exception as e:
             st.error(f"Error getting available dates: {str(e)}")
@@ -333,7 +466,7 @@ class CSVManager:
             
             if os.path.exists(self.face_encodings_dir):
                 for filename in os.listdir(self.face_encodings_dir):
-                    if filename.endswith('.pkl'):
+                    if filename.endswith(('.npy', '.json', '.jsonl', '.bin', '.pkl')):
                         src = os.path.join(self.face_encodings_dir, filename)
                         dst = os.path.join(encodings_backup_dir, filename)
                         shutil.copy2(src, dst)
@@ -350,39 +483,16 @@ class CSVManager:
         try:
             files_info = []
             
-            if os.path.exists(self.daily_attendance_dir):
-                for filename in os.listdir(self.daily_attendance_dir):
-                    if filename.endswith('.csv'):
-                        file_path = os.path.join(self.daily_attendance_dir, filename)
-                        
-                        # Get file stats
-                        stat = os.stat(file_path)
-                        file_size = stat.st_size
-                        modified_time = datetime.fromtimestamp(stat.st_mtime)
-                        
-                        # Get record count
-                        try:
-                            df = pd.read_csv(file_path)
-                            record_count = len(df)
-                        except:
-                            record_count = 0
-                        
-                        # Extract date from filename
-                        date_str = filename.replace('.csv', '')
-                        try:
-                            date_obj = datetime.strptime(date_str, '%d-%m-%Y')
-                            formatted_date = date_obj.strftime('%Y-%m-%d')
-                        except ValueError:
-                            formatted_date = date_str
-                        
-                        files_info.append({
-                            'filename': filename,
-                            'date': formatted_date,
-                            'record_count': record_count,
-                            'file_size': file_size,
-                            'modified_time': modified_time,
-                            'file_path': file_path
-                        })
+            # Row counts, sizes and mtimes come from the manifest (recounted only if a file changed)
+            for formatted_date, entry in self.attendance_manifest.files_info().items():
+                files_info.append({
+                    'filename': entry['filename'],
+                    'date': formatted_date,
+                    'record_count': entry['rows'],
+                    'file_size': entry['size'],
+                    'modified_time': datetime.fromtimestamp(entry['mtime']),
+                    'file_path': os.path.join(self.daily_attendance_dir, entry['filename'])
+                })
             
             # Sort by date (newest first)
             files_info.sort(key=lambda x: x['date'], reverse=True)
@@ -392,6 +502,14 @@ class CSVManager:
             st.error(f"Error getting files info: {str(e)}")
             return []
     
+    def rebuild_attendance_manifest(self) -> Tuple[bool, str]:
+        """Rebuild the daily files manifest from a directory scan (e.g. after copying files in by hand)"""
+        try:
+            file_count = self.attendance_manifest.rebuild()
+            return True, f"Indexed {file_count} daily attendance files"
+        except Exception as e:
+            return False, f"Error rebuilding attendance index: {str(e)}"
+    
     def download_daily_file(self, target_date: date) -> Tuple[bool, str]:
         """Prepare a daily attendance file for download"""
         try:
@@ -408,23 +526,25 @@ class CSVManager:
     def delete_teacher(self, teacher_id: str) -> Tuple[bool, str]:
         """Delete a teacher from the system"""
         try:
-            teachers_df = self.get_all_teachers()
-            
-            if teacher_id not in teachers_df['ID'].values:
+            teacher = self.get_teacher(teacher_id)
+            if teacher is None:
                 return False, "Teacher not found"
             
             # Get teacher info
-            teacher_row = teachers_df[teachers_df['ID'] == teacher_id]
-            teacher_name = teacher_row['Name'].iloc[0]
-            encoding_path = teacher_row['Face_Encoding_Path'].iloc[0]
+            teacher_name = teacher['Name']
+            encoding_path = teacher['Face_Encoding_Path']
             
             # Remove from teachers CSV
-            teachers_df = teachers_df[teachers_df['ID'] != teacher_id]
+            teachers_df = self._teacher_registry()
+            teachers_df = teachers_df[teachers_df['ID'].astype(str) != str(teacher_id)]
             teachers_df.to_csv(self.teachers_file, index=False)
+            self._teachers_version += 1
             
-            # Delete face encoding file
-            if os.path.exists(encoding_path):
+            # Delete face encoding
+            self.encoding_store.delete(str(teacher_id))
+            if isinstance(encoding_path, str) and encoding_path.endswith('.pkl') and os.path.exists(encoding_path):
                 os.remove(encoding_path)
+            get_shared_gallery().bump_version()
             
             return True, f"Teacher {teacher_name} deleted successfully"
             
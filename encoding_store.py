@@ -0,0 +1,242 @@
+import numpy as np
+import os
+import json
+import threading
+from typing import Dict, List, Tuple
+
+from gallery_index import ENCODING_SIZE
+
+
+class EncodingStore:
+    """
+    Face encoding storage backed by a single memory-mapped NumPy matrix.
+
+    Layout inside the store directory:
+      encodings.npy        compacted (N x 128) float64 matrix, opened with mmap
+      encodings_ids.json   teacher ID for every row of encodings.npy
+      encodings_rows.bin   raw float64 rows appended since the last compaction
+      encodings_log.jsonl  append/tombstone log for the rows above
+
+    Adding a teacher appends rows to encodings_rows.bin and an "add" entry to
+    the log; deleting appends a "delete" tombstone. compact() folds everything
+    back into encodings.npy. A teacher may own several rows (templates).
+    """
+
+    _write_lock = threading.Lock()
+
+    def __init__(self, directory: str = "face_encodings", compact_threshold: int = 256):
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, "encodings.npy")
+        self.ids_path = os.path.join(directory, "encodings_ids.json")
+        self.rows_path = os.path.join(directory, "encodings_rows.bin")
+        self.log_path = os.path.join(directory, "encodings_log.jsonl")
+        self.compact_threshold = compact_threshold
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._signature = None
+        self._row_ids = np.empty(0, dtype=object)
+        self._live = np.empty(0, dtype=bool)
+        self._base = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        self._appended = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        self._log_entries = 0
+
+    def _file_signature(self) -> Tuple:
+        signature = []
+        for path in (self.matrix_path, self.ids_path, self.rows_path, self.log_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _refresh(self):
+        """Reload the store if any of its files changed since the last load"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+
+        if os.path.exists(self.matrix_path) and os.path.exists(self.ids_path):
+            base = np.load(self.matrix_path, mmap_mode='r')
+            with open(self.ids_path, 'r') as f:
+                base_ids = json.load(f)
+        else:
+            base = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+            base_ids = []
+
+        row_bytes = ENCODING_SIZE * np.dtype(np.float64).itemsize
+        appended_rows = os.path.getsize(self.rows_path) // row_bytes if os.path.exists(self.rows_path) else 0
+        if appended_rows:
+            appended = np.memmap(self.rows_path, dtype=np.float64, mode='r',
+                                 shape=(appended_rows, ENCODING_SIZE))
+        else:
+            appended = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+
+        # Replay the log over the compacted rows
+        row_ids = list(base_ids) + [None] * appended_rows
+        live = np.zeros(len(row_ids), dtype=bool)
+        live[:len(base_ids)] = True
+        log_entries = 0
+
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    log_entries += 1
+                    if entry['op'] == 'delete':
+                        live[[i for i, row_id in enumerate(row_ids) if row_id == entry['id']]] = False
+                    elif entry['op'] == 'add':
+                        for row in entry['rows']:
+                            if row < appended_rows:
+                                row_ids[len(base_ids) + row] = entry['id']
+                                live[len(base_ids) + row] = True
+
+        self._base = base
+        self._appended = appended
+        self._row_ids = np.array(row_ids, dtype=object)
+        self._live = live
+        self._log_entries = log_entries
+        self._signature = signature
+
+    def _append_log(self, entry: Dict):
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def add(self, teacher_id: str, encodings: np.ndarray):
+        """Store one encoding (or several templates) for a teacher, replacing any previous ones"""
+        rows = np.ascontiguousarray(encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+
+        with self._write_lock:
+            self._refresh()
+            if teacher_id in self:
+                self._append_log({'op': 'delete', 'id': teacher_id})
+
+            row_bytes = ENCODING_SIZE * np.dtype(np.float64).itemsize
+            first_row = os.path.getsize(self.rows_path) // row_bytes if os.path.exists(self.rows_path) else 0
+            with open(self.rows_path, 'ab') as f:
+                f.write(rows.tobytes())
+            self._append_log({'op': 'add', 'id': teacher_id,
+                              'rows': list(range(first_row, first_row + len(rows)))})
+
+            if self._log_entries + 1 >= self.compact_threshold:
+                self._compact_locked()
+
+    def delete(self, teacher_id: str) -> bool:
+        """Tombstone all encodings of a teacher; returns False if none were stored"""
+        with self._write_lock:
+            self._refresh()
+            if teacher_id not in self:
+                return False
+            self._append_log({'op': 'delete', 'id': teacher_id})
+            return True
+
+    def __contains__(self, teacher_id: str) -> bool:
+        self._refresh()
+        return bool(np.any(self._live & (self._row_ids == teacher_id)))
+
+    def __len__(self) -> int:
+        """Number of teachers with at least one stored encoding"""
+        self._refresh()
+        return len(set(self._row_ids[self._live]))
+
+    def get_gallery(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row IDs, N x 128 matrix) of all live encodings.
+
+        When the store is compacted this is the memory-mapped matrix itself.
+        """
+        self._refresh()
+        if len(self._appended) == 0 and self._live.all():
+            return self._row_ids, self._base
+
+        live = np.flatnonzero(self._live)
+        matrix = np.empty((len(live), ENCODING_SIZE), dtype=np.float64)
+        base_rows = live[live < len(self._base)]
+        matrix[:len(base_rows)] = self._base[base_rows]
+        matrix[len(base_rows):] = self._appended[live[len(base_rows):] - len(self._base)]
+        return self._row_ids[live], matrix
+
+    def get_encodings(self) -> Dict[str, np.ndarray]:
+        """Return {teacher_id: encoding} (or a K x 128 template array for teachers with several)"""
+        ids, matrix = self.get_gallery()
+        if len(ids) == 0:
+            return {}
+
+        # Group rows by teacher in one pass (stable, so templates keep their order).
+        # A teacher's rows are normally contiguous already, in which case the
+        # results are slices of the (memory-mapped) matrix rather than copies.
+        unique_ids, first_rows, inverse = np.unique(ids.astype(str), return_index=True, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        if np.any(order != np.arange(len(order))):
+            matrix = matrix[order]
+        ends = np.cumsum(np.bincount(inverse, minlength=len(unique_ids)))
+        starts = ends - np.bincount(inverse, minlength=len(unique_ids))
+
+        encodings = {}
+        for u in np.argsort(first_rows):
+            rows = matrix[starts[u]:ends[u]]
+            encodings[ids[first_rows[u]]] = rows[0] if len(rows) == 1 else rows
+        return encodings
+
+    def compact(self):
+        """Rewrite live encodings into encodings.npy and clear the append log"""
+        with self._write_lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        self._signature = None
+        ids, matrix = self.get_gallery()
+        matrix = np.array(matrix, dtype=np.float64)
+
+        tmp_matrix = self.matrix_path + ".tmp.npy"
+        tmp_ids = self.ids_path + ".tmp"
+        np.save(tmp_matrix, matrix)
+        with open(tmp_ids, 'w') as f:
+            json.dump([str(teacher_id) for teacher_id in ids], f)
+
+        # Release our mmap of the old matrix before replacing it
+        self._base = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        self._appended = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_ids, self.ids_path)
+        for path in (self.rows_path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._signature = None
+
+    def import_legacy_pickles(self, encoding_paths: Dict[str, str]) -> List[str]:
+        """One-time migration of per-teacher pickle files into the store.
+
+        Only used when the store is still empty; returns the IDs imported.
+        """
+        import pickle
+
+        imported = []
+        encodings = {}
+        for teacher_id, path in encoding_paths.items():
+            if isinstance(path, str) and path.endswith('.pkl') and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    encodings[teacher_id] = pickle.load(f)
+
+        with self._write_lock:
+            self._refresh()
+            if len(self._row_ids) > 0 or not encodings:
+                return imported
+
+            ids = []
+            rows = []
+            for teacher_id, encoding in encodings.items():
+                encoding = np.asarray(encoding, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+                ids.extend([teacher_id] * len(encoding))
+                rows.append(encoding)
+                imported.append(teacher_id)
+
+            np.save(self.matrix_path, np.vstack(rows))
+            with open(self.ids_path, 'w') as f:
+                json.dump([str(teacher_id) for teacher_id in ids], f)
+            self._signature = None
+
+        return imported
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+try:
+    import face_recognition
+except ImportError:
+    face_recognition = None
+
+# Weights for OpenCV's ResNet-10 SSD face detector (not shipped with the repo)
+DNN_MODEL_DIR = "models"
+DNN_CONFIG_FILE = "deploy.prototxt"
+DNN_WEIGHTS_FILE = "res10_300x300_ssd_iter_140000.caffemodel"
+
+# Detector picked by benchmarks/detector_benchmark.py --save
+DETECTOR_SETTINGS_FILE = "data/detector_settings.json"
+DEFAULT_DETECTOR = "hog"
+
+
+class FaceDetector(ABC):
+    """Face detector backend: RGB image in, (top, right, bottom, left) boxes out"""
+
+    name = ""
+
+    @abstractmethod
+    def is_available(self) -> bool:
+        """Whether the backend's libraries and model files are present"""
+
+    @abstractmethod
+    def detect(self, rgb_image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """Face boxes in the image"""
+
+
+class HOGDetector(FaceDetector):
+    """dlib HOG + linear SVM; fast on CPU, misses small and strongly turned faces"""
+
+    name = "hog"
+
+    def __init__(self, upsample: int = 1):
+        self.upsample = upsample
+
+    def is_available(self) -> bool:
+        return face_recognition is not None
+
+    def detect(self, rgb_image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        return face_recognition.face_locations(rgb_image, self.upsample, model="hog")
+
+
+class CNNDetector(HOGDetector):
+    """dlib MMOD CNN; most accurate of the three but slow without a GPU"""
+
+    name = "cnn"
+
+    def detect(self, rgb_image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        return face_recognition.face_locations(rgb_image, self.upsample, model="cnn")
+
+
+class OpenCVDNNDetector(FaceDetector):
+    """OpenCV's ResNet-10 SSD face detector, run at a fixed 300x300 input.
+
+    The instance is shared by every FaceRecognitionSystem in the process (the
+    page's and the recognition worker's), and a cv2.dnn.Net is not safe to use
+    from two threads at once, so loading and each setInput/forward pair run
+    under a lock.
+    """
+
+    name = "opencv_dnn"
+
+    def __init__(self, model_dir: str = DNN_MODEL_DIR, min_confidence: float = 0.5, input_size: int = 300):
+        self.config_path = os.path.join(model_dir, DNN_CONFIG_FILE)
+        self.weights_path = os.path.join(model_dir, DNN_WEIGHTS_FILE)
+        self.min_confidence = min_confidence
+        self.input_size = input_size
+        self._net = None
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return cv2 is not None and os.path.exists(self.config_path) and os.path.exists(self.weights_path)
+
+    def detect(self, rgb_image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        height, width = rgb_image.shape[:2]
+        size = (self.input_size, self.input_size)
+        # The network was trained on BGR input with these channel means
+        blob = cv2.dnn.blobFromImage(cv2.resize(rgb_image, size), 1.0, size, (104.0, 177.0, 123.0), swapRB=True)
+        with self._lock:
+            if self._net is None:
+                self._net = cv2.dnn.readNetFromCaffe(self.config_path, self.weights_path)
+            self._net.setInput(blob)
+            detections = self._net.forward()[0, 0]
+
+        face_locations = []
+        for detection in detections[detections[:, 2] >= self.min_confidence]:
+            left, top, right, bottom = detection[3:7] * np.array([width, height, width, height])
+            top, left = max(0, int(top)), max(0, int(left))
+            bottom, right = min(height, int(bottom)), min(width, int(right))
+            if bottom > top and right > left:
+                face_locations.append((top, right, bottom, left))
+        return face_locations
+
+
+DETECTOR_BACKENDS = {
+    HOGDetector.name: HOGDetector,
+    CNNDetector.name: CNNDetector,
+    OpenCVDNNDetector.name: OpenCVDNNDetector,
+}
+
+# One instance per backend and process, so DNN weights are only loaded once
+_detectors: Dict[str, FaceDetector] = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector(name: str) -> FaceDetector:
+    """Return the shared detector instance for a backend name"""
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown face detector '{name}'. Choose from {sorted(DETECTOR_BACKENDS)}")
+    with _detectors_lock:
+        if name not in _detectors:
+            _detectors[name] = DETECTOR_BACKENDS[name]()
+        return _detectors[name]
+
+
+def available_detectors() -> List[str]:
+    """Names of the backends that can run in this installation"""
+    return [name for name in DETECTOR_BACKENDS if get_detector(name).is_available()]
+
+
+def load_detector_choice(settings_file: str = DETECTOR_SETTINGS_FILE) -> Tuple[str, float]:
+    """Detector saved by the benchmark and the detection scale it was measured at,
+    falling back to HOG at full resolution if none was saved or it is unavailable"""
+    try:
+        with open(settings_file, 'r') as f:
+            settings = json.load(f)
+        name = settings.get('detector', DEFAULT_DETECTOR)
+        if name in DETECTOR_BACKENDS and get_detector(name).is_available():
+            return name, float(settings.get('scale', 1.0))
+    except Exception:
+        pass
+    return DEFAULT_DETECTOR, 1.0
+
+
+def save_detector_choice(name: str, results: Dict, scale: float = 1.0,
+                         settings_file: str = DETECTOR_SETTINGS_FILE) -> bool:
+    """Persist the benchmark's pick together with the scale it ran at and its measurements"""
+    try:
+        os.makedirs(os.path.dirname(settings_file), exist_ok=True)
+        with open(settings_file, 'w') as f:
+            json.dump({'detector': name, 'scale': scale, 'benchmark': results}, f, indent=2)
+        return True
+    except Exception as e:
+        print(f"Error saving detector settings: {e}")
+        return False
@@ -1,8 +1,15 @@
 import numpy as np
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Union
 import streamlit as st
-from PIL import Image
 import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from gallery_index import build_gallery_index, ENCODING_SIZE
+from face_tracker import FaceTracker, FaceTrack
+from face_detectors import get_detector, load_detector_choice, DEFAULT_DETECTOR
+from frame import Frame, as_frame, load_image
+from frame_filters import MotionGate, check_face_crop, check_face_geometry, MIN_IMAGE_SIZE, MIN_FACE_AREA_RATIO
 
 # Face recognition libraries (optional for Vercel deployment)
 try:
@@ -14,50 +21,351 @@ except ImportError:
     cv2 = None
     face_recognition = None
 
+def locate_faces(rgb_image: np.ndarray, scale: float = 1.0,
+                 detector: str = DEFAULT_DETECTOR) -> List[Tuple[int, int, int, int]]:
+    """Detect faces on a copy resized by scale and return boxes in full-resolution coordinates"""
+    face_detector = get_detector(detector)
+    if scale >= 1.0:
+        return face_detector.detect(rgb_image)
+    
+    small_image = cv2.resize(rgb_image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = rgb_image.shape[:2]
+    
+    face_locations = []
+    for top, right, bottom, left in face_detector.detect(small_image):
+        face_locations.append((
+            max(0, int(round(top / scale))),
+            min(width, int(round(right / scale))),
+            min(height, int(round(bottom / scale))),
+            max(0, int(round(left / scale)))
+        ))
+    return face_locations
+
+def analyze_enrollment_photo(rgb_image: np.ndarray, detection_scale: float = 1.0, encode: bool = True,
+                             with_landmarks: bool = False, detector: str = DEFAULT_DETECTOR) -> Dict:
+    """Validate (and encode) an enrollment photo with a single face detection.
+    
+    Returns a dict with 'ok', 'message', 'face_location', 'landmarks' and
+    'encoding'; fields that were not reached or not requested are None.
+    """
+    analysis = {'ok': False, 'message': "", 'face_location': None, 'landmarks': None, 'encoding': None}
+    
+    # Check image size
+    height, width = rgb_image.shape[:2]
+    if height < MIN_IMAGE_SIZE or width < MIN_IMAGE_SIZE:
+        analysis['message'] = "Image too small. Please use higher resolution image."
+        return analysis
+    
+    # Detect faces (the only detection for this photo)
+    face_locations = locate_faces(rgb_image, detection_scale, detector)
+    if not face_locations:
+        analysis['message'] = "No face detected. Please ensure face is clearly visible."
+        return analysis
+    if len(face_locations) > 1:
+        analysis['message'] = "Multiple faces detected. Please use image with single face."
+        return analysis
+    
+    face_location = face_locations[0]
+    analysis['face_location'] = face_location
+    
+    # Check face size relative to image, then blur/exposure of the crop
+    ok, message = check_face_geometry(rgb_image.shape, face_location, MIN_FACE_AREA_RATIO)
+    if ok:
+        ok, message = check_face_crop(rgb_image, face_location)
+    if not ok:
+        analysis['message'] = message
+        return analysis
+    
+    if with_landmarks:
+        analysis['landmarks'] = face_recognition.face_landmarks(rgb_image, [face_location])[0]
+    
+    if encode:
+        face_encodings = face_recognition.face_encodings(rgb_image, [face_location])
+        if not face_encodings:
+            analysis['message'] = "Could not encode face."
+            return analysis
+        analysis['encoding'] = face_encodings[0]
+    
+    analysis['ok'] = True
+    analysis['message'] = "Face quality is good"
+    return analysis
+
+def _enroll_photo(name: str, data: bytes, detection_scale: float,
+                  detector: str = DEFAULT_DETECTOR) -> Tuple[Optional[np.ndarray], str]:
+    """Decode, validate and encode a single enrollment photo (runs in a worker process)"""
+    try:
+        rgb_image = load_image(io.BytesIO(data)).rgb
+        
+        analysis = analyze_enrollment_photo(rgb_image, detection_scale, detector=detector)
+        if not analysis['ok']:
+            return None, f"{name}: {analysis['message']}"
+        return analysis['encoding'], ""
+    except Exception as e:
+        return None, f"Error processing {name}: {str(e)}"
+
+# Enrollment photos kept as separate templates for each teacher
+MAX_TEMPLATES_PER_TEACHER = 5
+
 class FaceRecognitionSystem:
-    def __init__(self, confidence_threshold: float = 0.6):
+    def __init__(self, confidence_threshold: float = 0.6, index_type: str = "auto",
+                 ivf_threshold: int = 2000, n_probe: int = 8, detection_scale: Optional[float] = None,
+                 precision: str = "float64", quality_gate: bool = True, detector: str = "auto"):
         self.confidence_threshold = confidence_threshold
+        # Face detector backend; "auto" uses the one picked by the detector benchmark,
+        # and unless a detection scale is given, the scale it was benchmarked at
+        auto_scale = 1.0
+        if detector == "auto":
+            detector, auto_scale = load_detector_choice()
+        self.detector = detector
+        if detection_scale is None:
+            detection_scale = auto_scale
+        # Skip encoding face crops that are too small, blurred or badly exposed to match
+        self.quality_gate = quality_gate
+        self.detection_scale = max(0.1, min(1.0, detection_scale))
         self.known_face_encodings = {}
         self.known_face_names = {}
         
+        # Gallery index settings: brute force for small galleries, IVF for large ones,
+        # stored as float64, float32 or int8
+        self.index_type = index_type
+        self.ivf_threshold = ivf_threshold
+        self.n_probe = n_probe
+        self.precision = precision
+        self.known_face_ids = np.empty(0, dtype=object)
+        self.gallery_index = build_gallery_index([], np.empty((0, ENCODING_SIZE)), index_type,
+                                                 precision=precision)
+        
+        # Version of the shared gallery currently loaded (-1 = not from the shared gallery)
+        self.gallery_version = -1
+        
+        # Optional tracker that lets recognize_faces reuse identities across frames
+        self.tracker: Optional[FaceTracker] = None
+        
+        # Optional motion gate: static frames reuse the last detection/recognition
+        self.motion_gate: Optional[MotionGate] = None
+        self._last_face_locations = []
+        self._last_results = []
+        
     def load_known_faces(self, face_encodings_dict: Dict[str, np.ndarray], 
-                        teacher_names_dict: Dict[str, str]):
-        """Load known face encodings and names"""
+                        teacher_names_dict: Dict[str, str], gallery_index=None):
+        """Load known face encodings and names.
+        
+        gallery_index may be an index already built from the same encodings
+        (e.g. shared between sessions), in which case it is reused as-is.
+        """
         self.known_face_encodings = face_encodings_dict
-        self.known_face_names = teacher_names_dict
+        self.gallery_version = -1
+        
+        # Build the gallery once as a contiguous (rows x 128) matrix with a
+        # parallel ID array, so matching never touches the dict again. Each
+        # teacher owns a segment of up to MAX_TEMPLATES_PER_TEACHER rows.
+        # Teachers without any template are left out: an empty segment would
+        # make the per-teacher minimum pick up the next teacher's distance
+        gallery = {}
+        for teacher_id, encoding in face_encodings_dict.items():
+            teacher_templates = np.asarray(encoding, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+            if len(teacher_templates):
+                gallery[teacher_id] = teacher_templates[:MAX_TEMPLATES_PER_TEACHER]
+        
+        known_face_ids = np.array(list(gallery.keys()), dtype=object)
+        if gallery_index is None:
+            gallery_index = self._build_index(known_face_ids, list(gallery.values()))
+        # Names, IDs and index are swapped in together, only once all are complete
+        self.known_face_names, self.known_face_ids, self.gallery_index = (
+            teacher_names_dict, known_face_ids, gallery_index)
+    
+    def _build_index(self, known_face_ids: np.ndarray, templates: List[np.ndarray]):
+        """Gallery index over the teachers' template segments, in known_face_ids order"""
+        counts = np.array([len(t) for t in templates], dtype=np.int64)
+        segment_starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+        
+        known_face_matrix = np.empty((int(counts.sum()), ENCODING_SIZE), dtype=np.float64)
+        for start, teacher_templates in zip(segment_starts, templates):
+            known_face_matrix[start:start + len(teacher_templates)] = teacher_templates
+        
+        return build_gallery_index(
+            known_face_ids, known_face_matrix, self.index_type,
+            ivf_threshold=self.ivf_threshold, n_probe=self.n_probe, precision=self.precision,
+            segment_starts=segment_starts
+        )
+    
+    def _search_gallery(self, face_encodings: List[np.ndarray], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, teacher indices) of the k nearest known teachers per encoding, nearest first"""
+        queries = np.asarray(face_encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+        return self.gallery_index.search(queries, min(k, len(self.gallery_index)))
+    
+    def _assign_unique(self, candidate_distances: np.ndarray,
+                       candidates: np.ndarray) -> List[Tuple[Optional[str], float]]:
+        """Pick one teacher per face from its candidates so no teacher is used twice"""
+        num_faces, k = candidates.shape
+        if num_faces == 0:
+            return []
+        if k == 0:
+            return [(None, float('inf'))] * num_faces
+        
+        best = candidates[:, 0]
+        if np.all(best >= 0) and len(np.unique(best)) == num_faces:
+            return [(self.known_face_ids[g], float(candidate_distances[f, 0])) for f, g in enumerate(best)]
+        
+        # Two faces want the same teacher: resolve greedily in order of distance
+        assigned = [(None, float('inf'))] * num_faces
+        taken = set()
+        for flat_index in np.argsort(candidate_distances, axis=None):
+            f, c = divmod(int(flat_index), k)
+            g = int(candidates[f, c])
+            if g < 0:
+                continue
+            if assigned[f][0] is None and g not in taken:
+                assigned[f] = (self.known_face_ids[g], float(candidate_distances[f, c]))
+                taken.add(g)
+                if len(taken) == min(num_faces, k):
+                    break
+        
+        return assigned
+    
+    def _candidate_lists(self, candidate_distances: np.ndarray, candidates: np.ndarray,
+                         top_k: int) -> List[List[Dict]]:
+        """Turn search results into per-face lists of the top_k nearest teachers"""
+        candidate_lists = []
+        for distances, rows in zip(candidate_distances[:, :top_k], candidates[:, :top_k]):
+            candidate_lists.append([
+                {
+                    'teacher_id': self.known_face_ids[g],
+                    'teacher_name': self.known_face_names.get(self.known_face_ids[g], "Unknown"),
+                    'distance': float(distance),
+                    'confidence': 1.0 - float(distance)
+                }
+                for distance, g in zip(distances, rows) if g >= 0
+            ])
+        return candidate_lists
+    
+    def match_encodings(self, face_encodings: List[np.ndarray]) -> List[Tuple[Optional[str], float]]:
+        """Match all faces of a frame at once, assigning each teacher to at most one face.
+        
+        Returns one (teacher_id, distance) pair per input encoding; teacher_id is
+        None when no teacher is left for that face (e.g. empty gallery).
+        """
+        # Only the F nearest teachers per face can ever be needed to resolve
+        # conflicts between faces, so ask the index for exactly that many
+        return self._assign_unique(*self._search_gallery(face_encodings, len(face_encodings)))
+    
+    def enable_tracking(self, reencode_interval: int = 10, iou_threshold: float = 0.3):
+        """Track faces across recognize_faces calls, re-encoding a recognized face only every reencode_interval frames"""
+        self.tracker = FaceTracker(iou_threshold=iou_threshold, reencode_interval=reencode_interval)
+    
+    def disable_tracking(self):
+        """Go back to encoding every detected face on every frame"""
+        self.tracker = None
+    
+    def enable_motion_gate(self, threshold: float = 0.01, pixel_threshold: int = 25):
+        """Only run detection when at least `threshold` of a downsampled frame changed"""
+        self.motion_gate = MotionGate(threshold=threshold, pixel_threshold=pixel_threshold)
+    
+    def disable_motion_gate(self):
+        """Run detection on every frame"""
+        self.motion_gate = None
+    
+    def _check_crops(self, rgb_image: np.ndarray, face_locations: List[Tuple[int, int, int, int]]) -> List[Optional[str]]:
+        """Return the quality problem of each face crop, or None if it is worth encoding"""
+        if not self.quality_gate:
+            return [None] * len(face_locations)
+        
+        issues = []
+        for face_location in face_locations:
+            ok, message = check_face_crop(rgb_image, face_location)
+            issues.append(None if ok else message)
+        return issues
+    
+    def _match_faces(self, rgb_image: np.ndarray, face_locations: List[Tuple[int, int, int, int]],
+                     quality_issues: List[Optional[str]],
+                     top_k: int = 0) -> Tuple[List[Tuple[Optional[str], float]], List[List[Dict]]]:
+        """Encode the faces that passed the quality gate and match them in one pass"""
+        matches = [(None, float('inf'))] * len(face_locations)
+        candidate_lists = [[] for _ in face_locations]
+        
+        good = [i for i, issue in enumerate(quality_issues) if issue is None]
+        if good:
+            # Encode at full resolution; the same partial-sorted search yields the top_k candidates
+            face_encodings = face_recognition.face_encodings(rgb_image, [face_locations[i] for i in good])
+            candidate_distances, candidates = self._search_gallery(face_encodings, max(len(face_encodings), top_k))
+            good_matches = self._assign_unique(candidate_distances, candidates)
+            good_candidates = self._candidate_lists(candidate_distances, candidates, top_k)
+            for i, match, face_candidates in zip(good, good_matches, good_candidates):
+                matches[i] = match
+                candidate_lists[i] = face_candidates
+        
+        return matches, candidate_lists
     
-    def detect_faces_in_image(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    def _match_tracks(self, rgb_image: np.ndarray, tracks: List[FaceTrack], tolerance: float,
+                      quality_issues: List[Optional[str]],
+                      top_k: int = 0) -> Tuple[List[Tuple[Optional[str], float]], List[List[Dict]]]:
+        """Encode only the tracks that need it and reuse the last identity for the rest"""
+        stale_tracks = [track for track, issue in zip(tracks, quality_issues)
+                        if track.needs_encoding and issue is None]
+        
+        if stale_tracks:
+            face_encodings = face_recognition.face_encodings(
+                rgb_image, [track.face_location for track in stale_tracks]
+            )
+            # Teachers still held by tracks that reuse their identity this frame
+            # are not available to the re-encoded ones (one teacher per face)
+            held_ids = {track.teacher_id for track in tracks
+                        if track.teacher_id is not None and track not in stale_tracks}
+            held_rows = np.flatnonzero(np.isin(self.known_face_ids, list(held_ids))) if held_ids else []
+            
+            candidate_distances, candidates = self._search_gallery(
+                face_encodings, max(len(face_encodings) + len(held_rows), top_k))
+            candidate_lists = self._candidate_lists(candidate_distances, candidates, top_k)
+            if len(held_rows):
+                held = np.isin(candidates, held_rows)
+                candidates = np.where(held, -1, candidates)
+                candidate_distances = np.where(held, np.inf, candidate_distances)
+            matches = self._assign_unique(candidate_distances, candidates)
+            
+            for track, (teacher_id, distance), track_candidates in zip(stale_tracks, matches, candidate_lists):
+                if teacher_id is not None and distance <= tolerance:
+                    track.set_identity(teacher_id, distance, self.tracker.reencode_interval)
+                else:
+                    # Leave unrecognized tracks without identity so they are retried next frame
+                    track.set_identity(None, distance, self.tracker.reencode_interval)
+                track.candidates = track_candidates
+        
+        return [(track.teacher_id, track.distance) for track in tracks], [track.candidates for track in tracks]
+    
+    def _locate_faces(self, rgb_image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """Detect faces on a downscaled copy (if configured) and return full-resolution boxes"""
+        return locate_faces(rgb_image, self.detection_scale, self.detector)
+    
+    def detect_faces_in_image(self, image: Union[np.ndarray, Frame]) -> List[Tuple[int, int, int, int]]:
         """Detect face locations in an image"""
         if not FACE_RECOGNITION_AVAILABLE:
             st.warning("Face recognition not available in this deployment. Please use local version for full functionality.")
             return []
 
         try:
-            # Convert BGR to RGB if needed
-            if len(image.shape) == 3 and image.shape[2] == 3:
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_image = image
+            # Nothing moved since the last processed frame: reuse its detections
+            if self.motion_gate is not None and not self.motion_gate.has_motion(image):
+                return self._last_face_locations
+            
+            # BGR arrays are converted once; Frames in RGB order are used as is
+            rgb_image = as_frame(image).rgb
 
             # Find face locations
-            face_locations = face_recognition.face_locations(rgb_image)
+            face_locations = self._locate_faces(rgb_image)
+            self._last_face_locations = face_locations
             return face_locations
         except Exception as e:
             st.error(f"Error detecting faces: {str(e)}")
             return []
     
-    def encode_face(self, image: np.ndarray, face_location: Tuple[int, int, int, int] = None) -> Optional[np.ndarray]:
+    def encode_face(self, image: Union[np.ndarray, Frame], face_location: Tuple[int, int, int, int] = None) -> Optional[np.ndarray]:
         """Generate face encoding from image"""
         if not FACE_RECOGNITION_AVAILABLE:
             # Return a dummy encoding for demo purposes
             return np.random.rand(128).astype(np.float64)
 
         try:
-            # Convert BGR to RGB if needed
-            if len(image.shape) == 3 and image.shape[2] == 3:
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_image = image
+            rgb_image = as_frame(image).rgb
 
             if face_location:
                 face_encodings = face_recognition.face_encodings(rgb_image, [face_location])
@@ -71,69 +379,88 @@ class FaceRecognitionSystem:
             st.error(f"Error encoding face: {str(e)}")
             return None
     
-    def recognize_faces(self, image: np.ndarray) -> List[Dict]:
-        """Recognize faces in an image and return results"""
+    def recognize_faces(self, image: Union[np.ndarray, Frame], top_k: int = 0,
+                        report_errors: bool = True) -> List[Dict]:
+        """Recognize faces in an image and return results.
+        
+        With top_k > 0 every result also lists the top_k nearest teachers under
+        'candidates', e.g. for queueing low-confidence arrivals for review.
+        With report_errors=False errors are raised instead of shown in the page,
+        for callers outside the Streamlit script thread. 'fresh' is False for
+        results that were not matched from a new encoding in this call (a tracked
+        face reusing its identity, or a static frame replaying the last results).
+        """
         results = []
 
         if not FACE_RECOGNITION_AVAILABLE:
+            if not report_errors:
+                raise RuntimeError("Face recognition is not available in this deployment")
             st.info("Face recognition not available in this deployment. Please use local version for full functionality.")
             return []
 
         try:
-            # Convert BGR to RGB if needed
-            if len(image.shape) == 3 and image.shape[2] == 3:
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_image = image
+            # Nothing moved since the last processed frame: reuse its results
+            if self.motion_gate is not None and not self.motion_gate.has_motion(image):
+                return [dict(result, fresh=False) for result in self._last_results]
+            
+            rgb_image = as_frame(image).rgb
 
-            # Find face locations and encodings
-            face_locations = face_recognition.face_locations(rgb_image)
-            face_encodings = face_recognition.face_encodings(rgb_image, face_locations)
+            tolerance = 1.0 - self.confidence_threshold
             
-            for face_encoding, face_location in zip(face_encodings, face_locations):
-                # Compare with known faces
-                matches = face_recognition.compare_faces(
-                    list(self.known_face_encodings.values()), 
-                    face_encoding,
-                    tolerance=1.0 - self.confidence_threshold
-                )
-                
-                # Calculate face distances
-                face_distances = face_recognition.face_distance(
-                    list(self.known_face_encodings.values()), 
-                    face_encoding
-                )
-                
+            # Find face locations (possibly on a reduced copy)
+            face_locations = self._locate_faces(rgb_image)
+            track_ids = [None] * len(face_locations)
+            
+            # Cheap blur/exposure check on each crop before spending dlib time on it
+            quality_issues = self._check_crops(rgb_image, face_locations)
+            
+            # Faces encoded in this call; the others carry no new evidence
+            fresh = [issue is None for issue in quality_issues]
+            if self.tracker is None:
+                matches, candidate_lists = self._match_faces(rgb_image, face_locations, quality_issues, top_k)
+            else:
+                tracks = self.tracker.update(face_locations)
+                fresh = [track.needs_encoding and issue is None for track, issue in zip(tracks, quality_issues)]
+                matches, candidate_lists = self._match_tracks(rgb_image, tracks, tolerance, quality_issues, top_k)
+                track_ids = [track.track_id for track in tracks]
+            
+            for (best_id, best_distance), face_location, track_id, face_candidates, quality_issue, is_fresh in zip(
+                    matches, face_locations, track_ids, candidate_lists, quality_issues, fresh):
                 teacher_id = "Unknown"
                 teacher_name = "Unknown"
                 confidence = 0.0
                 
-                if True in matches:
-                    best_match_index = np.argmin(face_distances)
-                    if matches[best_match_index]:
-                        teacher_ids = list(self.known_face_encodings.keys())
-                        teacher_id = teacher_ids[best_match_index]
-                        teacher_name = self.known_face_names.get(teacher_id, "Unknown")
-                        confidence = 1.0 - face_distances[best_match_index]
+                if best_id is not None and best_distance <= tolerance:
+                    teacher_id = best_id
+                    teacher_name = self.known_face_names.get(teacher_id, "Unknown")
+                    confidence = 1.0 - best_distance
                 
                 results.append({
                     'teacher_id': teacher_id,
                     'teacher_name': teacher_name,
                     'confidence': confidence,
                     'face_location': face_location,
+                    'track_id': track_id,
+                    'candidates': face_candidates,
+                    'quality_issue': quality_issue,
+                    'fresh': is_fresh,
                     'is_recognized': teacher_id != "Unknown" and confidence >= self.confidence_threshold
                 })
             
+            self._last_face_locations = face_locations
+            self._last_results = results
             return results
             
         except Exception as e:
+            if not report_errors:
+                raise
             st.error(f"Error recognizing faces: {str(e)}")
             return []
     
-    def draw_face_boxes(self, image: np.ndarray, recognition_results: List[Dict]) -> np.ndarray:
+    def draw_face_boxes(self, image: Union[np.ndarray, Frame], recognition_results: List[Dict]) -> np.ndarray:
         """Draw bounding boxes and labels on faces"""
         try:
-            output_image = image.copy()
+            output_image = as_frame(image).bgr.copy()
             
             for result in recognition_results:
                 top, right, bottom, left = result['face_location']
@@ -160,7 +487,7 @@ class FaceRecognitionSystem:
             
         except Exception as e:
             st.error(f"Error drawing face boxes: {str(e)}")
-            return image
+            return as_frame(image).bgr
     
     def process_uploaded_images(self, uploaded_files: List) -> Tuple[bool, List[np.ndarray], str]:
         """Process multiple uploaded images for teacher registration"""
@@ -169,18 +496,11 @@ class FaceRecognitionSystem:
             processed_images = []
             
             for uploaded_file in uploaded_files:
-                # Read image
-                image = Image.open(uploaded_file)
-                image_array = np.array(image)
-                
-                # Convert to RGB if needed
-                if len(image_array.shape) == 3 and image_array.shape[2] == 3:
-                    rgb_image = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-                else:
-                    rgb_image = image_array
+                # Decode upright and at a reduced size; detection and encoding use the RGB pixels directly
+                frame = load_image(uploaded_file)
                 
                 # Detect faces
-                face_locations = self.detect_faces_in_image(rgb_image)
+                face_locations = self.detect_faces_in_image(frame)
                 
                 if not face_locations:
                     return False, [], f"No face detected in {uploaded_file.name}"
@@ -189,13 +509,13 @@ class FaceRecognitionSystem:
                     return False, [], f"Multiple faces detected in {uploaded_file.name}. Please use images with single face."
                 
                 # Encode face
-                face_encoding = self.encode_face(rgb_image, face_locations[0])
+                face_encoding = self.encode_face(frame, face_locations[0])
                 
                 if face_encoding is None:
                     return False, [], f"Could not encode face in {uploaded_file.name}"
                 
                 face_encodings.append(face_encoding)
-                processed_images.append(rgb_image)
+                processed_images.append(frame.bgr)
             
             # Average the encodings for better accuracy
             if face_encodings:
@@ -207,59 +527,84 @@ class FaceRecognitionSystem:
         except Exception as e:
             return False, [], f"Error processing images: {str(e)}"
     
-    def validate_face_quality(self, image: np.ndarray) -> Tuple[bool, str]:
-        """Validate if the face image is of good quality for recognition"""
+    def enroll_teacher_photos(self, uploaded_files: List,
+                              max_workers: Optional[int] = None) -> Tuple[bool, List[np.ndarray], Optional[np.ndarray], str]:
+        """Decode, detect and encode all enrollment photos in a single pass.
+        
+        Photos are fanned out over a process pool. Returns (success, per-photo
+        encodings, averaged template, message).
+        """
+        if not FACE_RECOGNITION_AVAILABLE:
+            # Dummy encodings for demo purposes
+            face_encodings = [self.encode_face(None) for _ in uploaded_files]
+            return True, face_encodings, np.mean(face_encodings, axis=0), "Images processed successfully"
+        
         try:
-            # Convert to RGB if needed
-            if len(image.shape) == 3 and image.shape[2] == 3:
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_image = image
-            
-            # Check image size
-            height, width = rgb_image.shape[:2]
-            if height < 100 or width < 100:
-                return False, "Image too small. Please use higher resolution image."
-            
-            # Detect faces
-            face_locations = face_recognition.face_locations(rgb_image)
+            names = [getattr(f, 'name', f"photo {i + 1}") for i, f in enumerate(uploaded_files)]
+            photos = [f.getvalue() if hasattr(f, 'getvalue') else f.read() for f in uploaded_files]
+            scales = [self.detection_scale] * len(photos)
+            detectors = [self.detector] * len(photos)
             
-            if not face_locations:
-                return False, "No face detected. Please ensure face is clearly visible."
-            
-            if len(face_locations) > 1:
-                return False, "Multiple faces detected. Please use image with single face."
+            workers = min(len(photos), max_workers or os.cpu_count() or 1)
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    outcomes = list(pool.map(_enroll_photo, names, photos, scales, detectors))
+            else:
+                outcomes = list(map(_enroll_photo, names, photos, scales, detectors))
             
-            # Check face size relative to image
-            top, right, bottom, left = face_locations[0]
-            face_width = right - left
-            face_height = bottom - top
+            face_encodings = []
+            for face_encoding, error in outcomes:
+                if face_encoding is None:
+                    return False, [], None, error
+                face_encodings.append(face_encoding)
             
-            if face_width < 50 or face_height < 50:
-                return False, "Face too small in image. Please move closer to camera."
+            if not face_encodings:
+                return False, [], None, "No valid face encodings found"
             
-            # Check if face takes reasonable portion of image
-            face_area_ratio = (face_width * face_height) / (width * height)
-            if face_area_ratio < 0.05:
-                return False, "Face too small relative to image. Please move closer."
+            # Average the encodings for better accuracy
+            return True, face_encodings, np.mean(face_encodings, axis=0), "Images processed successfully"
             
-            return True, "Face quality is good"
+        except Exception as e:
+            return False, [], None, f"Error processing images: {str(e)}"
+    
+    def validate_face_quality(self, image: Union[np.ndarray, Frame]) -> Tuple[bool, str]:
+        """Validate if the face image is of good quality for recognition"""
+        try:
+            analysis = self.analyze_enrollment_photo(image, encode=False)
+            return analysis['ok'], analysis['message']
             
         except Exception as e:
             return False, f"Error validating face quality: {str(e)}"
     
+    def analyze_enrollment_photo(self, image: Union[np.ndarray, Frame], encode: bool = True,
+                                 with_landmarks: bool = False) -> Dict:
+        """Quality verdict, face box, optional landmarks and encoding from one detection"""
+        rgb_image = as_frame(image).rgb
+        
+        return analyze_enrollment_photo(rgb_image, self.detection_scale, encode, with_landmarks, self.detector)
+    
     def set_confidence_threshold(self, threshold: float):
         """Update confidence threshold"""
         self.confidence_threshold = max(0.0, min(1.0, threshold))
     
-    def get_face_landmarks(self, image: np.ndarray) -> List[Dict]:
+    def set_detection_scale(self, scale: float):
+        """Update the factor frames are resized by before face detection (1.0 = full resolution)"""
+        self.detection_scale = max(0.1, min(1.0, scale))
+    
+    def set_detector(self, detector: str) -> Tuple[bool, str]:
+        """Switch the face detector backend (hog, cnn or opencv_dnn)"""
+        try:
+            if not get_detector(detector).is_available():
+                return False, f"Face detector '{detector}' is not available in this installation"
+            self.detector = detector
+            return True, f"Face detector set to {detector}"
+        except ValueError as e:
+            return False, str(e)
+    
+    def get_face_landmarks(self, image: Union[np.ndarray, Frame]) -> List[Dict]:
         """Get facial landmarks for detected faces"""
         try:
-            # Convert BGR to RGB if needed
-            if len(image.shape) == 3 and image.shape[2] == 3:
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_image = image
+            rgb_image = as_frame(image).rgb
             
             face_landmarks_list = face_recognition.face_landmarks(rgb_image)
             return face_landmarks_list
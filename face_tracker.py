@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+class FaceTrack:
+    """A face followed across frames, with the identity last matched to it"""
+
+    def __init__(self, track_id: int, face_location: Tuple[int, int, int, int]):
+        self.track_id = track_id
+        self.face_location = face_location
+        self.teacher_id: Optional[str] = None
+        self.distance = float('inf')
+        self.candidates: List[Dict] = []
+        self.frames_since_encoding = 0
+        self.missed_frames = 0
+
+    @property
+    def needs_encoding(self) -> bool:
+        return self.teacher_id is None or self.frames_since_encoding <= 0
+
+    def set_identity(self, teacher_id: Optional[str], distance: float, reencode_interval: int):
+        self.teacher_id = teacher_id
+        self.distance = distance
+        self.frames_since_encoding = reencode_interval
+
+
+def box_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection-over-union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    intersection = max(0, bottom - top) * max(0, right - left)
+    if intersection == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / float(area_a + area_b - intersection)
+
+
+def _centroid_distance(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Distance between box centres, relative to the width of box a"""
+    dy = (a[0] + a[2] - b[0] - b[2]) / 2.0
+    dx = (a[1] + a[3] - b[1] - b[3]) / 2.0
+    return np.hypot(dx, dy) / max(1, a[1] - a[3])
+
+
+class FaceTracker:
+    """
+    Lightweight IoU/centroid tracker for face boxes.
+
+    Detections in consecutive frames are associated with existing tracks by
+    box overlap (falling back to centre distance for fast movement), so a
+    teacher standing in front of the camera keeps the same track and its last
+    identity. A recognized track is only re-encoded every reencode_interval
+    frames; new and still-unrecognized tracks are encoded every frame.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_centroid_shift: float = 0.5,
+                 reencode_interval: int = 10, max_missed_frames: int = 5):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_shift = max_centroid_shift
+        self.reencode_interval = max(1, reencode_interval)
+        self.max_missed_frames = max_missed_frames
+        self.tracks: List[FaceTrack] = []
+        self._next_track_id = 1
+
+    def reset(self):
+        """Forget all tracks (e.g. when the camera is stopped)"""
+        self.tracks = []
+
+    def update(self, face_locations: List[Tuple[int, int, int, int]]) -> List[FaceTrack]:
+        """Associate this frame's detections with tracks; returns one track per location"""
+        # Score every (track, detection) pair, then associate greedily, best pair first
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for d, location in enumerate(face_locations):
+                iou = box_iou(track.face_location, location)
+                if iou >= self.iou_threshold:
+                    pairs.append((1.0 + iou, t, d))
+                else:
+                    shift = _centroid_distance(track.face_location, location)
+                    if shift <= self.max_centroid_shift:
+                        pairs.append((1.0 - shift, t, d))
+        pairs.sort(reverse=True)
+
+        assigned: List[Optional[FaceTrack]] = [None] * len(face_locations)
+        matched_tracks = set()
+        for _, t, d in pairs:
+            if t in matched_tracks or assigned[d] is not None:
+                continue
+            track = self.tracks[t]
+            track.face_location = face_locations[d]
+            track.frames_since_encoding -= 1
+            track.missed_frames = 0
+            assigned[d] = track
+            matched_tracks.add(t)
+
+        # Age out tracks that were not seen in this frame
+        surviving = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed_frames += 1
+                if track.missed_frames > self.max_missed_frames:
+                    continue
+            surviving.append(track)
+        self.tracks = surviving
+
+        # Start new tracks for unmatched detections
+        for d, location in enumerate(face_locations):
+            if assigned[d] is None:
+                track = FaceTrack(self._next_track_id, location)
+                self._next_track_id += 1
+                self.tracks.append(track)
+                assigned[d] = track
+
+        return assigned
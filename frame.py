@@ -0,0 +1,87 @@
+import numpy as np
+from typing import BinaryIO, Dict, Optional, Union
+from PIL import Image, ImageOps
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Enrollment photos are decoded to at most this long edge; phone photos (12-48 MP)
+# carry far more detail than face detection and encoding can use
+DECODE_MAX_LONG_EDGE = 1600
+
+_CONVERSIONS = {
+    ("BGR", "RGB"): "COLOR_BGR2RGB",
+    ("RGB", "BGR"): "COLOR_RGB2BGR",
+}
+
+
+class Frame:
+    """
+    An image together with its channel order ("BGR", "RGB" or "GRAY").
+
+    Consumers ask for the order they need instead of converting blindly:
+    `rgb` for dlib/face_recognition, `bgr` for OpenCV drawing and display.
+    The native order is returned as is, and each other order is converted
+    at most once per frame and cached, so a frame passed through detection,
+    crop checks, encoding and landmarks costs one colour conversion in total.
+    Single-channel and 4-channel images are passed through unchanged.
+    """
+
+    __slots__ = ("pixels", "order", "_converted")
+
+    def __init__(self, pixels: np.ndarray, order: str = "BGR"):
+        if pixels.ndim != 3 or pixels.shape[2] != 3:
+            order = "GRAY"
+        self.pixels = pixels
+        self.order = order
+        self._converted: Dict[str, np.ndarray] = {}
+
+    @property
+    def shape(self):
+        return self.pixels.shape
+
+    def to(self, order: str) -> np.ndarray:
+        """Pixels in the requested order, as a contiguous array (dlib rejects strided views)"""
+        if order == self.order or self.order == "GRAY":
+            return self.pixels
+        if order not in self._converted:
+            if cv2 is not None:
+                code = getattr(cv2, _CONVERSIONS[(self.order, order)])
+                self._converted[order] = cv2.cvtColor(self.pixels, code)
+            else:
+                self._converted[order] = np.ascontiguousarray(self.pixels[..., ::-1])
+        return self._converted[order]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        return self.to("RGB")
+
+    @property
+    def bgr(self) -> np.ndarray:
+        return self.to("BGR")
+
+
+def as_frame(image: Union[np.ndarray, Frame], order: str = "BGR") -> Frame:
+    """Wrap a raw array (3-channel arrays are BGR unless stated otherwise); Frames pass through"""
+    return image if isinstance(image, Frame) else Frame(image, order)
+
+
+def load_image(source: Union[str, BinaryIO], max_long_edge: Optional[int] = DECODE_MAX_LONG_EDGE) -> Frame:
+    """Decode an image file to an upright RGB Frame no larger than max_long_edge.
+
+    JPEGs are decoded directly at a reduced scale (1/2, 1/4 or 1/8) via draft
+    mode, so a 48 MP photo never exists at full size in memory; the remainder
+    is a cheap resize. The EXIF orientation is applied before any detection.
+    """
+    image = Image.open(source)
+    if max_long_edge and max(image.size) > max_long_edge:
+        ratio = max_long_edge / float(max(image.size))
+        image.draft('RGB', (int(image.width * ratio), int(image.height * ratio)))
+
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    if max_long_edge and max(image.size) > max_long_edge:
+        image.thumbnail((max_long_edge, max_long_edge), Image.BILINEAR)
+
+    return Frame(np.array(image), "RGB")
@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Optional, Tuple, Union
+
+from frame import Frame, as_frame
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Face quality thresholds, shared by enrollment validation and the live crop gate
+MIN_IMAGE_SIZE = 100          # pixels, enrollment photos only
+MIN_FACE_SIZE = 50            # pixels, width and height of the face box
+MIN_FACE_AREA_RATIO = 0.05    # face box / image area, enrollment photos only
+MIN_SHARPNESS = 15.0          # variance of the Laplacian on a 100 px wide crop
+MIN_BRIGHTNESS = 30.0         # mean luminance of the crop (0-255)
+MAX_BRIGHTNESS = 230.0
+
+# Crops are resized to this width before measuring sharpness, so the
+# Laplacian variance does not depend on how large the face is in the frame
+_SHARPNESS_CROP_WIDTH = 100
+
+
+def check_face_geometry(image_shape: Tuple[int, ...], face_location: Tuple[int, int, int, int],
+                        min_area_ratio: float = 0.0) -> Tuple[bool, str]:
+    """Check that a face box is large enough (absolutely and relative to the image)"""
+    top, right, bottom, left = face_location
+    face_width = right - left
+    face_height = bottom - top
+
+    if face_width < MIN_FACE_SIZE or face_height < MIN_FACE_SIZE:
+        return False, "Face too small in image. Please move closer to camera."
+
+    height, width = image_shape[:2]
+    if (face_width * face_height) / float(width * height) < min_area_ratio:
+        return False, "Face too small relative to image. Please move closer."
+
+    return True, "Face size is good"
+
+
+def check_face_crop(rgb_image: np.ndarray, face_location: Tuple[int, int, int, int]) -> Tuple[bool, str]:
+    """Fast blur/exposure check on the face crop only, to skip hopeless crops before encoding"""
+    ok, message = check_face_geometry(rgb_image.shape, face_location)
+    if not ok or cv2 is None:
+        return ok, message
+
+    top, right, bottom, left = face_location
+    crop = rgb_image[max(0, top):bottom, max(0, left):right]
+    gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY) if crop.ndim == 3 else crop
+
+    brightness = float(gray.mean())
+    if brightness < MIN_BRIGHTNESS:
+        return False, "Face too dark. Please improve lighting."
+    if brightness > MAX_BRIGHTNESS:
+        return False, "Face overexposed. Please reduce direct light."
+
+    scale = _SHARPNESS_CROP_WIDTH / float(gray.shape[1])
+    gray = cv2.resize(gray, (_SHARPNESS_CROP_WIDTH, max(1, int(gray.shape[0] * scale))),
+                      interpolation=cv2.INTER_AREA)
+    if cv2.Laplacian(gray, cv2.CV_64F).var() < MIN_SHARPNESS:
+        return False, "Face too blurry. Please hold still."
+
+    return True, "Face quality is good"
+
+
+class MotionGate:
+    """
+    Cheap frame-difference gate placed in front of face detection.
+
+    Each frame is reduced to a small blurred grayscale thumbnail and compared
+    with the thumbnail of the last frame that passed the gate. The frame only
+    passes when more than `threshold` of the thumbnail pixels changed by at
+    least `pixel_threshold` grey levels, so an empty corridor costs one resize
+    and one absdiff per frame instead of a full detection.
+    """
+
+    def __init__(self, threshold: float = 0.01, pixel_threshold: int = 25, thumbnail_width: int = 160):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.thumbnail_width = thumbnail_width
+        self._reference: Optional[np.ndarray] = None
+
+    def reset(self):
+        """Forget the reference frame so the next frame always passes"""
+        self._reference = None
+
+    def _thumbnail(self, image: Union[np.ndarray, Frame]) -> np.ndarray:
+        frame = as_frame(image)
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.thumbnail_width / float(width))
+        # Subsample with a strided view, then shrink and convert to grayscale,
+        # so no full-size copy of the frame is ever made
+        step = max(1, int(width // (2 * self.thumbnail_width)))
+        small = cv2.resize(frame.pixels[::step, ::step], (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        if frame.order != "GRAY":
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY if frame.order == "BGR" else cv2.COLOR_RGB2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def has_motion(self, image: Union[np.ndarray, Frame]) -> bool:
+        """Return True if the scene changed enough since the last frame that passed"""
+        if cv2 is None:
+            return True
+
+        thumbnail = self._thumbnail(image)
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            self._reference = thumbnail
+            return True
+
+        changed = np.count_nonzero(cv2.absdiff(thumbnail, self._reference) >= self.pixel_threshold)
+        if changed >= self.threshold * thumbnail.size:
+            # Compare against the last processed frame, so slow changes still add up
+            self._reference = thumbnail
+            return True
+        return False
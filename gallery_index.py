@@ -0,0 +1,256 @@
+import numpy as np
+from typing import List, Optional, Tuple
+
+# Dimensionality of dlib face encodings
+ENCODING_SIZE = 128
+
+
+def pairwise_distances(queries: np.ndarray, matrix: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+    """Euclidean distances between every query row and every gallery row (F x N)"""
+    return np.sqrt(np.maximum(_squared_distances(queries, matrix, sq_norms), 0.0))
+
+
+def _squared_distances(queries: np.ndarray, matrix: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+    # ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g, where the cross term is one BLAS product
+    return (np.einsum('ij,ij->i', queries, queries)[:, None]
+            + sq_norms[None, :]
+            - 2.0 * (queries @ matrix.T))
+
+
+def _top_k(distances: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the k smallest distances per row, sorted, with their column indices"""
+    n = distances.shape[1]
+    if k < n:
+        columns = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        columns = np.tile(np.arange(n), (distances.shape[0], 1))
+    top = np.take_along_axis(distances, columns, axis=1)
+    order = np.argsort(top, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(columns, order, axis=1)
+
+
+PRECISIONS = ("float64", "float32", "int8")
+
+# Rows of int8 codes converted to float32 per block in the int8 kernel
+_INT8_BLOCK_ROWS = 4096
+
+
+class EncodingMatrix:
+    """
+    Gallery rows stored as float64, float32 or scalar-quantized int8.
+
+    int8 rows are quantized per dimension (code = round(x / scale)) and
+    compared without dequantizing the gallery: q.g ~= (q * scale).code, with
+    the codes widened to float32 one block at a time. The widening costs
+    about what the smaller scan saves, so int8 is a memory saving (8x vs
+    float64), not a speed-up; float32 is the faster option.
+    """
+
+    def __init__(self, matrix: np.ndarray, precision: str = "float64"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown gallery precision: {precision}")
+        self.precision = precision
+        matrix = np.asarray(matrix, dtype=np.float64)
+
+        if precision == "int8":
+            max_abs = np.abs(matrix).max(axis=0) if len(matrix) else np.ones(matrix.shape[1])
+            self.scale = np.where(max_abs > 0, max_abs / 127.0, 1.0)
+            self.data = np.clip(np.rint(matrix / self.scale), -127, 127).astype(np.int8)
+            dequantized = self.data * self.scale
+            self.sq_norms = np.einsum('ij,ij->i', dequantized, dequantized).astype(np.float32)
+            self.scale = self.scale.astype(np.float32)
+        else:
+            self.data = np.ascontiguousarray(matrix, dtype=precision)
+            self.sq_norms = np.einsum('ij,ij->i', self.data, self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def query_dtype(self):
+        return np.float64 if self.precision == "float64" else np.float32
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.sq_norms.nbytes
+
+    def distances(self, queries: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Euclidean distances from every query to every (selected) gallery row"""
+        queries = np.asarray(queries, dtype=self.query_dtype)
+        data = self.data if rows is None else self.data[rows]
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+
+        if self.precision != "int8":
+            return pairwise_distances(queries, data, sq_norms)
+
+        scaled_queries = queries * self.scale
+        cross = np.empty((len(queries), len(data)), dtype=np.float32)
+        for start in range(0, len(data), _INT8_BLOCK_ROWS):
+            block = data[start:start + _INT8_BLOCK_ROWS].astype(np.float32)
+            cross[:, start:start + _INT8_BLOCK_ROWS] = scaled_queries @ block.T
+        squared = np.einsum('ij,ij->i', queries, queries)[:, None] + sq_norms[None, :] - 2.0 * cross
+        return np.sqrt(np.maximum(squared, 0.0))
+
+
+def _row_labels(n_rows: int, segment_starts: Optional[np.ndarray]) -> np.ndarray:
+    """Map every gallery row to the position of its teacher in ids"""
+    if segment_starts is None:
+        return np.arange(n_rows)
+    counts = np.diff(np.append(segment_starts, n_rows))
+    return np.repeat(np.arange(len(segment_starts)), counts)
+
+
+class BruteForceIndex:
+    """Exact gallery index: scans every known encoding.
+
+    Each teacher owns a contiguous segment of rows (one per template) starting
+    at segment_starts[i]; a teacher's distance is the minimum over its segment.
+    """
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray, precision: str = "float64",
+                 segment_starts: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.vectors = EncodingMatrix(matrix, precision)
+        self.segment_starts = segment_starts
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, teacher indices) of the k nearest teachers per query, nearest first"""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+        k = min(k, len(self))
+        if len(queries) == 0 or k == 0:
+            return np.empty((len(queries), 0)), np.empty((len(queries), 0), dtype=np.int64)
+
+        # All template distances in one pass, then a segmented min per teacher
+        distances = self.vectors.distances(queries)
+        if self.segment_starts is not None:
+            distances = np.minimum.reduceat(distances, self.segment_starts, axis=1)
+        return _top_k(distances, k)
+
+
+class IVFIndex:
+    """Approximate gallery index using an inverted file over k-means partitions.
+
+    The gallery is split into n_lists clusters; a query is only compared with
+    the rows of its n_probe nearest clusters. Raising n_probe trades speed for
+    recall, with n_probe == n_lists being an exact scan. Templates of the same
+    teacher (see BruteForceIndex) are reduced to the best one per teacher.
+    """
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray, n_lists: int = None,
+                 n_probe: int = 8, n_iter: int = 10, seed: int = 0, precision: str = "float64",
+                 segment_starts: Optional[np.ndarray] = None):
+        self.ids = ids
+        matrix = np.asarray(matrix, dtype=np.float64)
+        n = len(matrix)
+
+        if n_lists is None:
+            n_lists = int(4 * np.sqrt(n))
+        self.n_lists = max(1, min(n_lists, n))
+        self.n_probe = max(1, min(n_probe, self.n_lists))
+
+        rng = np.random.default_rng(seed)
+        self.centroids = self._train_centroids(matrix, rng, n_iter)
+        self.centroid_sq_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+
+        # Store rows grouped by list so each probed list is one contiguous slice
+        assignments = self._assign(matrix)
+        self.order = np.argsort(assignments, kind='stable')
+        self.vectors = EncodingMatrix(matrix[self.order], precision)
+        self.list_offsets = np.searchsorted(assignments[self.order], np.arange(self.n_lists + 1))
+        self.has_templates = segment_starts is not None
+        self.labels = _row_labels(n, segment_starts)[self.order]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _assign(self, matrix: np.ndarray) -> np.ndarray:
+        return np.argmin(_squared_distances(matrix, self.centroids, self.centroid_sq_norms), axis=1)
+
+    def _train_centroids(self, matrix: np.ndarray, rng: np.random.Generator, n_iter: int) -> np.ndarray:
+        """Plain Lloyd k-means on a sample of the gallery"""
+        sample_size = min(len(matrix), 32 * self.n_lists)
+        sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+            labels = np.argmin(_squared_distances(sample, centroids, sq_norms), axis=1)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            filled = counts > 0
+
+            # Per-cluster sums via one sort + segmented reduction
+            order = np.argsort(labels, kind='stable')
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            centroids[filled] = sums / counts[filled, None]
+            # Re-seed empty clusters from random sample points
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+
+        return centroids
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, teacher indices) of the k nearest teachers among the probed lists.
+
+        Rows that could not be filled (fewer than k candidates) have distance inf
+        and index -1.
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+        k = min(k, len(self))
+        top_distances = np.full((len(queries), k), np.inf)
+        top_indices = np.full((len(queries), k), -1, dtype=np.int64)
+        if len(queries) == 0 or k == 0:
+            return top_distances, top_indices
+
+        coarse = pairwise_distances(queries, self.centroids, self.centroid_sq_norms)
+        _, probes = _top_k(coarse, self.n_probe)
+
+        for q, lists in enumerate(probes):
+            rows = np.concatenate([np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in lists])
+            if len(rows) == 0:
+                continue
+            distances = self.vectors.distances(queries[q:q + 1], rows)[0]
+            labels = self.labels[rows]
+
+            if self.has_templates:
+                # Keep each teacher's nearest template: first occurrence in distance order
+                by_distance = np.argsort(distances)
+                _, first = np.unique(labels[by_distance], return_index=True)
+                best = by_distance[np.sort(first)[:k]]
+            else:
+                _, found = _top_k(distances[None, :], min(k, len(rows)))
+                best = found[0]
+
+            top_distances[q, :len(best)] = distances[best]
+            top_indices[q, :len(best)] = labels[best]
+
+        return top_distances, top_indices
+
+
+def build_gallery_index(ids: List[str], matrix: np.ndarray, index_type: str = "auto",
+                        ivf_threshold: int = 2000, n_probe: int = 8, precision: str = "float64",
+                        segment_starts: Optional[np.ndarray] = None):
+    """Create the gallery index for the given encodings.
+
+    index_type is "brute", "ivf" or "auto" (IVF once the gallery has at least
+    ivf_threshold encodings); precision is "float64", "float32" or "int8".
+    With several templates per teacher, matrix rows are grouped by teacher and
+    segment_starts gives the first row of each teacher in ids.
+    """
+    ids = np.asarray(ids, dtype=object)
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+    if segment_starts is not None and len(segment_starts) == len(matrix):
+        segment_starts = None  # one template per teacher
+
+    if index_type == "auto":
+        index_type = "ivf" if len(matrix) >= ivf_threshold else "brute"
+
+    if index_type == "ivf" and len(matrix) > 0:
+        return IVFIndex(ids, matrix, n_probe=n_probe, precision=precision, segment_starts=segment_starts)
+    if index_type in ("brute", "ivf"):
+        return BruteForceIndex(ids, matrix, precision, segment_starts=segment_starts)
+    raise ValueError(f"Unknown gallery index type: {index_type}")
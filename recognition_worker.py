@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from shared_gallery import get_shared_gallery
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+class RecognitionWorker:
+    """
+    Background recognition service decoupled from Streamlit reruns.
+
+    Frames go into a small bounded queue; when recognition falls behind, the
+    oldest pending frames are dropped so results always refer to recent frames.
+    A dedicated thread runs FaceRecognitionSystem.recognize_faces on each frame
+    and pushes results onto a bounded result channel that the UI polls.
+    Optionally a capture thread pulls frames from a camera or video source, so
+    throughput is set by the engine rather than by how often the page reruns.
+
+    The worker owns its FaceRecognitionSystem (with tracking and motion gating
+    enabled); the page only changes it through sync_with, which applies the
+    session's settings and gallery between frames.
+    """
+
+    def __init__(self, face_system, max_pending_frames: int = 2, max_results: int = 200, top_k: int = 0):
+        self.face_system = face_system
+        self.top_k = top_k
+        # Held while a frame is recognized, so settings never change mid-frame
+        self._system_lock = threading.Lock()
+        self._frames = deque(maxlen=max(1, max_pending_frames))
+        self._results = deque(maxlen=max_results)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        self.latest_frame: Optional[np.ndarray] = None
+        self.latest_results: List[Dict] = []
+        self.frames_submitted = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.last_error = ""
+
+    @property
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def sync_with(self, face_system, csv_manager):
+        """Apply the session system's settings and the current shared gallery to the worker's system"""
+        with self._system_lock:
+            self.face_system.set_confidence_threshold(face_system.confidence_threshold)
+            self.face_system.set_detection_scale(face_system.detection_scale)
+            self.face_system.detector = face_system.detector
+            get_shared_gallery().load_into(self.face_system, csv_manager)
+
+    def start(self, camera_source: Optional[Union[int, str]] = None) -> bool:
+        """Start the recognition thread, plus a capture thread if a camera/video source is given.
+
+        Returns False if threads from a previous run are still alive.
+        """
+        if self.is_running:
+            return False
+
+        with self._system_lock:
+            self.face_system.enable_tracking()
+            self.face_system.enable_motion_gate()
+        self.last_error = ""
+        self._stop_event.clear()
+        self._threads = [threading.Thread(target=self._recognition_loop, name="recognition-worker", daemon=True)]
+        if camera_source is not None:
+            self._threads.append(threading.Thread(target=self._capture_loop, args=(camera_source,),
+                                                  name="recognition-capture", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def stop(self, timeout: float = 2.0) -> bool:
+        """Stop all worker threads and drop pending frames.
+
+        Threads that do not finish within the timeout are kept, so is_running
+        stays True and start() will not launch a second loop next to them.
+        Returns True if every thread has stopped.
+        """
+        self._stop_event.set()
+        with self._condition:
+            self._frames.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        return not self._threads
+
+    def submit(self, frame: np.ndarray) -> bool:
+        """Queue a BGR frame for recognition; returns False if an older frame was dropped for it"""
+        with self._condition:
+            dropped = len(self._frames) == self._frames.maxlen
+            if dropped:
+                self.frames_dropped += 1
+            self._frames.append((time.time(), frame))
+            self.frames_submitted += 1
+            self._condition.notify()
+        return not dropped
+
+    def poll_results(self) -> List[Dict]:
+        """Drain and return all results produced since the last poll (oldest first)"""
+        with self._condition:
+            results = list(self._results)
+            self._results.clear()
+        return results
+
+    def latest(self) -> Tuple[Optional[np.ndarray], List[Dict]]:
+        """The last processed frame together with its results"""
+        with self._condition:
+            return self.latest_frame, self.latest_results
+
+    def _recognition_loop(self):
+        try:
+            self._process_frames()
+        finally:
+            # Tracks and the motion baseline are stale by the next start
+            with self._system_lock:
+                self.face_system.disable_tracking()
+                self.face_system.disable_motion_gate()
+
+    def _process_frames(self):
+        while not self._stop_event.is_set():
+            with self._condition:
+                while not self._frames and not self._stop_event.is_set():
+                    self._condition.wait(0.5)
+                if self._stop_event.is_set():
+                    return
+                timestamp, frame = self._frames.popleft()
+
+            try:
+                with self._system_lock:
+                    # Errors are raised rather than shown: this is not the script thread
+                    results = self.face_system.recognize_faces(frame, top_k=self.top_k, report_errors=False)
+            except Exception as e:
+                self.last_error = str(e)
+                continue
+
+            with self._condition:
+                self.latest_frame, self.latest_results = frame, results
+                self.frames_processed += 1
+                self._results.append({'timestamp': timestamp, 'results': results})
+
+    def _capture_loop(self, camera_source: Union[int, str]):
+        if cv2 is None:
+            self.last_error = "OpenCV is not available for camera capture"
+            return
+
+        capture = cv2.VideoCapture(camera_source)
+        try:
+            if not capture.isOpened():
+                self.last_error = f"Could not open camera source {camera_source}"
+                return
+            while not self._stop_event.is_set():
+                ok, frame = capture.read()
+                if not ok:
+                    time.sleep(0.05)
+                    continue
+                self.submit(frame)
+        finally:
+            capture.release()
@@ -0,0 +1,59 @@
+import threading
+from typing import Dict, Tuple
+
+
+class SharedGallery:
+    """
+    Process-wide face gallery shared by every Streamlit session.
+
+    The gallery is read from disk once per version. CSVManager bumps the
+    version whenever a teacher is added or deleted, and sessions only reload
+    their FaceRecognitionSystem when the version they hold is out of date.
+    Built gallery indexes are shared as well, keyed by their settings.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._loaded_version = -1
+        self._face_encodings: Dict = {}
+        self._teacher_names: Dict = {}
+        self._indexes: Dict[Tuple, object] = {}
+
+    def bump_version(self):
+        """Mark the gallery as stale after teachers or encodings changed"""
+        with self._lock:
+            self.version += 1
+
+    def _reload(self, csv_manager):
+        teachers_df = csv_manager.get_all_teachers()
+        if teachers_df.empty:
+            self._face_encodings, self._teacher_names = {}, {}
+        else:
+            self._face_encodings = csv_manager.get_teacher_face_encodings()
+            self._teacher_names = dict(zip(teachers_df['ID'].astype(str), teachers_df['Name']))
+        self._indexes = {}
+        self._loaded_version = self.version
+
+    def load_into(self, face_system, csv_manager):
+        """Bring a session's FaceRecognitionSystem up to the current gallery version"""
+        if face_system.gallery_version == self.version:
+            return
+
+        with self._lock:
+            if self._loaded_version != self.version:
+                self._reload(csv_manager)
+
+            key = (face_system.index_type, face_system.ivf_threshold, face_system.n_probe, face_system.precision)
+            face_system.load_known_faces(self._face_encodings, self._teacher_names,
+                                         gallery_index=self._indexes.get(key))
+            self._indexes[key] = face_system.gallery_index
+            face_system.gallery_version = self._loaded_version
+
+
+_shared_gallery = SharedGallery()
+
+
+def get_shared_gallery() -> SharedGallery:
+    """Return the gallery singleton for this process"""
+    return _shared_gallery